@@ -0,0 +1,206 @@
+import io, os, re, sys, json, time, shutil, argparse, platform, resource, tempfile, subprocess
+import importlib.util
+from contextlib import redirect_stdout
+
+from tokens import get_estimator
+
+# ===== 打包器基准 =====
+# 每个 (打包器, 语料) 组合在独立子进程中运行：峰值 RSS 互不污染，
+# 初版脚本里的模块级全局状态（如 d_3.py 的 ARCH_MAP）也不会累积。
+# 结果以 JSON 输出，可用 --baseline 与上次结果对比找出回退。
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.normpath(os.path.join(HERE, '..', '..'))
+
+# 名称 -> (脚本路径, 调用方式)
+PACKERS = {
+    'd':         ('d.py',                 'packer'),
+    'normal':    ('aigv/初版/normal.py',   'packer'),
+    'min_token': ('aigv/初版/min_token.py', 'process_directory'),
+    'd_v1':      ('aigv/初版/d.py',        'process_directory'),
+    'd_3':       ('aigv/初版/d_3.py',      'main'),
+    'os_v1':     ('aigv/初版/os.py',       'main'),
+    'pir':       ('aigv/ir规范/os.py',     'pir'),
+}
+
+# 输出中每个文件的标记：各打包器过滤规则不同，files_per_s 只按实际输出的文件计
+HEADERS = {
+    'd':         re.compile(r'^--- BEGIN FILE: (.+) ---$', re.M),
+    'normal':    re.compile(r'^--- BEGIN FILE: (.+) ---$', re.M),
+    'min_token': re.compile(r'^\[FILE:(.+)\]$', re.M),
+    'd_3':       re.compile(r'^</([^<>]+)>$', re.M),
+    'os_v1':     re.compile(r'^</([^<>]+)>$', re.M),
+}
+
+CORPORA = ('code/os', 'code/asm', 'exer')
+IGN = {'.git', 'build', 'dist', '__pycache__', '.vscode', '.idea', 'node_modules', '.pir-cache'}
+
+def _load(name, rel):
+    spec = importlib.util.spec_from_file_location(f'bench_{name}', os.path.join(REPO, rel))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def run_one(name, root, out):
+    """子进程入口：运行一个打包器，返回耗时与峰值 RSS"""
+    rel, how = PACKERS[name]
+    mod = _load(name, rel)
+    t0 = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        if how == 'packer':
+            mod.ProjectPacker(root).pack(out)
+        elif how == 'pir':
+            mod.main(root, out, cache=False)
+        else:
+            getattr(mod, how)(root, out)
+    wall = time.perf_counter() - t0
+    return {'wall_s': wall, 'peak_rss_kb': peak_rss_kb()}
+
+def peak_rss_kb():
+    """本进程的峰值 RSS（KB）。
+    Linux 下 fork 出的子进程的 ru_maxrss 从父进程的峰值起算，exec 后也不清零，
+    所以优先读 /proc/self/status 的 VmHWM（随 exec 换新地址空间重新计）"""
+    try:
+        with open('/proc/self/status', 'r') as fd:
+            for line in fd:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # 没有 /proc 时退回 ru_maxrss：Linux 单位为 KB，macOS 为字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+    return rss
+
+def corpus_stats(root):
+    files = size = 0
+    for r, ds, fs in os.walk(root):
+        ds[:] = [d for d in ds if d not in IGN]
+        for f in fs:
+            files += 1
+            size += os.path.getsize(os.path.join(r, f))
+    return files, size
+
+def emitted_files(name, text, root):
+    """打包器实际输出的文件数"""
+    if name == 'pir':
+        import pirio
+        return len(pirio.read_text(io.StringIO(text)).get('UNITS', []))
+    if name == 'd_v1':
+        # 只处理顶层文件，每个文件以单独一行的文件名开头
+        top = {f for f in os.listdir(root) if os.path.isfile(os.path.join(root, f))}
+        return len(top & set(text.splitlines()))
+    return len(set(HEADERS[name].findall(text)))
+
+def scale_tree(src, n, dst):
+    """把 src 复制 n 份到 dst/copyK，得到 N 倍规模的合成语料"""
+    for i in range(n):
+        shutil.copytree(src, os.path.join(dst, f'copy{i}'),
+                        ignore=shutil.ignore_patterns(*IGN))
+    return dst
+
+def measure(name, root, out, rounds):
+    best = None
+    for _ in range(rounds):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', name, root, out],
+            capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        if best is None or r['wall_s'] < best['wall_s']:
+            rss = max(r['peak_rss_kb'], best['peak_rss_kb']) if best else r['peak_rss_kb']
+            best = dict(r, peak_rss_kb=rss)
+        else:
+            best['peak_rss_kb'] = max(best['peak_rss_kb'], r['peak_rss_kb'])
+    with open(out, 'r', encoding='utf-8', errors='ignore') as fd:
+        text = fd.read()
+    best['bytes_out'] = len(text.encode('utf-8'))
+    best['tokens_out'] = get_estimator()[1](text)
+    best['files_out'] = emitted_files(name, text, root)
+    return best
+
+def bench(packers, corpora, scale=10, rounds=3):
+    tmp = tempfile.mkdtemp(prefix='pir-bench-')
+    try:
+        targets = [(c, os.path.join(REPO, c)) for c in corpora]
+        if scale:
+            src = os.path.join(REPO, 'code/os')
+            targets.append((f'code/os x{scale}', scale_tree(src, scale, os.path.join(tmp, 'scaled'))))
+
+        results = []
+        for label, root in targets:
+            files, size = corpus_stats(root)
+            for name in packers:
+                out = os.path.join(tmp, f'{name}.out')
+                r = measure(name, root, out, rounds)
+                r.update(packer=name, corpus=label, files=files, bytes_in=size)
+                if 'wall_s' in r:
+                    r['files_per_s'] = r['files_out'] / r['wall_s'] if r['wall_s'] else None
+                results.append(r)
+                print(_fmt(r), file=sys.stderr)
+        return {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rounds': rounds,
+            'tokenizer': get_estimator()[0],
+            'scale': scale,
+            'results': results,
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def _fmt(r):
+    head = f"{r['packer']:<10} {r['corpus']:<14}"
+    if 'error' in r:
+        return f"{head} ERROR {r['error']}"
+    return (f"{head} {r['wall_s'] * 1000:9.1f} ms {r['peak_rss_kb'] / 1024:7.1f} MB "
+            f"{r['files_per_s']:9.0f} files/s ({r['files_out']}/{r['files']}) "
+            f"{r['bytes_in']:>9} -> {r['bytes_out']:>9} B "
+            f"{r['tokens_out']:>8} tok")
+
+def compare(report, baseline, threshold):
+    """与基线逐项比较 wall_s / peak_rss_kb / bytes_out，超过阈值视为回退"""
+    old = {(r['packer'], r['corpus']): r for r in baseline['results']}
+    regressions = []
+    for r in report['results']:
+        b = old.get((r['packer'], r['corpus']))
+        if not b or 'error' in r or 'error' in b:
+            continue
+        for key in ('wall_s', 'peak_rss_kb', 'bytes_out'):
+            if b[key] and r[key] > b[key] * (1 + threshold):
+                regressions.append(f"{r['packer']} {r['corpus']} {key}: {b[key]} -> {r[key]}")
+    return regressions
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        print(json.dumps(run_one(*sys.argv[2:5])))
+        sys.exit(0)
+
+    ap = argparse.ArgumentParser(description='对全部打包器做速度 / 体积基准')
+    ap.add_argument('-p', '--packer', action='append', choices=sorted(PACKERS),
+                    help='只测指定打包器（可重复）')
+    ap.add_argument('-c', '--corpus', action='append', help='语料目录，相对仓库根（可重复）')
+    ap.add_argument('--scale', type=int, default=10, help='合成语料：code/os 复制 N 份，0 关闭')
+    ap.add_argument('--rounds', type=int, default=3, help='每项重复次数，取最快一次')
+    ap.add_argument('-o', '--output', help='JSON 报告路径，默认写到标准输出')
+    ap.add_argument('--baseline', help='与此前的 JSON 报告比较')
+    ap.add_argument('--threshold', type=float, default=0.2, help='回退阈值（相对增幅）')
+    a = ap.parse_args()
+
+    report = bench(a.packer or list(PACKERS), a.corpus or CORPORA, a.scale, a.rounds)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if a.output:
+        with open(a.output, 'w', encoding='utf-8') as fd:
+            fd.write(text + '\n')
+    else:
+        print(text)
+
+    if a.baseline:
+        with open(a.baseline, 'r', encoding='utf-8') as fd:
+            regressions = compare(report, json.load(fd), a.threshold)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
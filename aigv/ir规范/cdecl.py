@@ -0,0 +1,293 @@
+import re, sys, time
+from collections import namedtuple
+
+# ===== 单遍 C 声明扫描器 =====
+# 取代 parse_funcs 的回溯正则：逐 token 扫描一次，只在花括号深度 0 处识别
+# 函数定义 (def) 与原型 (proto)，调用点 / 控制语句不会被当作函数。
+# 逗号分隔的声明符 (int a(void), b(int);) 逐个识别，共用开头的类型说明符；
+# 行号取声明开头（多行声明的返回类型所在行），逗号之后的声明符取其自身开头。
+# 同一遍里顺带记录函数体内的调用点 (calls)：'标识符 (' 且标识符不是关键字，
+# 按出现顺序去重；宏、函数指针成员同样会被记下，由调用方按已知符号过滤。
+
+Decl = namedtuple('Decl', 'ret name kind line end calls', defaults=((),))
+
+_TOK = re.compile(r'''
+    (?P<com>/\*(?:.*?\*/|.*)|//[^\n]*)
+  | (?P<pp>\#(?:\\\r?\n|[^\n])*)
+  | (?P<str>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?)
+  | (?P<id>[A-Za-z_]\w*)
+  | (?P<num>\d\w*)
+  | (?P<op>[^\s\w])
+''', re.S | re.X)
+
+# 不可能是函数名的关键字
+KEYWORDS = {
+    'if', 'else', 'while', 'for', 'do', 'switch', 'case', 'default', 'return',
+    'goto', 'break', 'continue', 'sizeof', 'typeof', '__typeof__', 'defined',
+    '_Alignof', '_Static_assert', 'typedef', 'struct', 'union', 'enum',
+    'void', 'char', 'short', 'int', 'long', 'float', 'double', 'signed',
+    'unsigned', 'const', 'volatile', 'static', 'extern', 'inline', 'register',
+    'auto', 'restrict', '_Bool',
+}
+
+# 声明中出现时连同其括号一起跳过
+ATTRS = {'__attribute__', '__attribute', '__declspec', 'asm', '__asm__', '__asm'}
+# asm 与括号之间允许的限定符：__asm__ __volatile__ ("...")、asm goto (...)
+ASM_QUALS = {'volatile', '__volatile__', '__volatile', 'goto', 'inline', '__inline__', '__inline'}
+
+def _skip_parens(it):
+    depth = 1
+    for m in it:
+        t = m.group()
+        if t == '(':
+            depth += 1
+        elif t == ')':
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    return None
+
+def _skip_attr(it):
+    """ATTRS 中的关键字之后：跳过 asm 限定符与紧随的括号，返回 ')' 的结束位置"""
+    for m in it:
+        t = m.group()
+        if t == '(':
+            return _skip_parens(it)
+        if t not in ASM_QUALS and m.lastgroup != 'com':
+            return None
+    return None
+
+def scan_decls(s):
+    it = _TOK.finditer(s)
+    depth = 0
+    toks = []       # 当前顶层声明已见 token
+    head = None     # toks 中第一个 token 的位置
+    spec = None     # 逗号之后的声明符沿用的类型说明符
+    skip = False    # 遇到 '=' 后直到 ';' / ',' 不再识别
+    pending = None  # 参数表已闭合，等待 '{' / ';' 决定 def / proto
+    line, pos = 1, 0
+    calls = []      # 当前函数体内的调用点
+    prev = None     # 函数体内上一个可能是被调函数名的标识符
+
+    for m in it:
+        kind = m.lastgroup
+        if kind == 'com' or kind == 'pp':
+            continue
+        t = m.group()
+
+        if depth:
+            if t == '{':
+                depth += 1
+            elif t == '}':
+                depth -= 1
+                if depth == 0:
+                    if pending:
+                        yield pending._replace(end=line + s.count('\n', pos, m.end()),
+                                               calls=tuple(dict.fromkeys(calls)))
+                        pending = None
+                    if not skip:
+                        toks, head, spec = [], None, None
+                    # '= {...}' 初始化列表之后声明继续，等待 ',' / ';'
+            elif t == '(' and prev and pending:
+                calls.append(prev)
+            prev = t if kind == 'id' and t not in KEYWORDS and t not in ATTRS else None
+            continue
+
+        if pending and pending.kind is None:
+            if t == '{':
+                line += s.count('\n', pos, pending.end)
+                pos = pending.end
+                pending = pending._replace(kind='def', end=None)
+                depth = 1
+                calls, prev = [], None
+                continue
+            if t == ';' or t == ',':
+                yield pending._replace(kind='proto', end=line + s.count('\n', pos, m.end()))
+                pending = None
+                if t == ';':
+                    toks, head, spec, skip = [], None, None, False
+                else:
+                    spec = _specifiers(toks) if spec is None else spec
+                    toks, head = list(spec), None
+                continue
+            if kind == 'id':
+                # 参数表后的属性 / 宏，例如 __attribute__((noreturn))
+                if t in ATTRS:
+                    _skip_attr(it)
+                continue
+            pending = None
+
+        if head is None:
+            head = m.start()
+        if kind == 'id' and t in ATTRS:
+            _skip_attr(it)
+            continue
+
+        if t == '{':
+            depth = 1
+            continue
+        if t == ';':
+            toks, head, spec, skip = [], None, None, False
+            continue
+        if t == ',' and toks:
+            # 初始化式中的逗号都在括号 / 花括号内，顶层逗号只分隔声明符
+            spec = _specifiers(toks) if spec is None else spec
+            toks, head, skip = list(spec), None, False
+            continue
+        if t == '=':
+            skip = True
+            continue
+
+        if t == '(':
+            close = _skip_parens(it)
+            if close is None:
+                break
+            if (not skip and len(toks) >= 2 and toks[0] != 'typedef'
+                    and toks[-1] not in KEYWORDS and _is_ident(toks[-1])
+                    and all(x == '*' or _is_ident(x) for x in toks[:-1])):
+                line += s.count('\n', pos, head)
+                pos = head
+                pending = Decl(' '.join(toks[:-1]), toks[-1], None, line, close)
+            toks.append('()')
+            continue
+
+        toks.append(t)
+
+def _is_ident(t):
+    return t[0].isalpha() or t[0] == '_'
+
+def _specifiers(toks):
+    """第一个声明符之前的类型说明符：'*' 之前；没有 '*' 时去掉声明符名及其后缀"""
+    for i, x in enumerate(toks):
+        if x == '*':
+            return toks[:i]
+        if not _is_ident(x):
+            return toks[:max(i - 1, 0)]
+    return toks[:-1]
+
+def parse_funcs(s):
+    return [(d.ret, d.name) for d in scan_decls(s)]
+
+# ===== 骨架 =====
+# 在 minify_c 的输出上把顶层函数体折叠成 {...}，原型、struct/enum/typedef、宏与全局变量原样保留。
+# 顶层 '{' 视为函数体的条件：所在语句中没有 '='（排除初始化列表、复合字面量），
+# 且最后一个顶层 '(' 前是函数名（__attribute__ 等的括号不算）。
+# 不带分号的宏调用（DECLARE_X(foo)）后紧跟下一条声明时，minify_c 已把换行并掉，
+# 所以顶层 ')' 之后出现类型 / 存储类关键字即视为上一条语句结束，后面的 struct 体不会被当成函数体。
+
+# 可以开始一条声明、却不能跟在函数形参表 ')' 之后的关键字
+DECL_START = {
+    'typedef', 'struct', 'union', 'enum', 'static', 'extern', 'inline', 'register',
+    'void', 'char', 'short', 'int', 'long', 'float', 'double', 'signed', 'unsigned', '_Bool',
+}
+
+_SKEL = re.compile(r'''"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|^\#[^\n]*|[A-Za-z_]\w*|[{}()=;]''', re.M)
+
+def skeleton(code):
+    out = []
+    last = 0
+    depth = 0       # 花括号深度
+    paren = 0       # 顶层的圆括号深度
+    name = None     # 最后一个顶层 '(' 前的标识符
+    prev = None     # 上一个标识符
+    eq = False      # 当前顶层语句中出现过 '='
+    body = None     # 正在折叠的函数体起点
+    closed = False  # 上一个记号是回到顶层的 ')'
+
+    for m in _SKEL.finditer(code):
+        t = m.group()
+        c = t[0]
+        after, closed = closed, False
+        if depth:
+            if t == '{':
+                depth += 1
+            elif t == '}':
+                depth -= 1
+                if depth == 0 and body is not None:
+                    out.append(code[last:body] + '{...}')
+                    last = m.end()
+                    body = None
+                    name, eq = None, False
+            continue
+
+        if c == '"' or c == "'" or c == '#':
+            prev = None
+        elif c == '_' or c.isalpha():
+            if after and t in DECL_START:
+                name, eq = None, False
+            prev = t
+        elif t == '(':
+            if paren == 0 and prev not in ATTRS:
+                name = prev if prev and prev not in KEYWORDS else None
+            paren += 1
+            prev = None
+        elif t == ')':
+            paren = max(paren - 1, 0)
+            closed = paren == 0
+            prev = None
+        elif t == '=':
+            if paren == 0:
+                eq = True
+        elif t == ';' or t == '}':
+            name, eq, paren, prev = None, False, 0, None
+        elif t == '{':
+            depth = 1
+            if paren == 0 and name and not eq:
+                body = m.start()
+            else:
+                name, eq, prev = None, False, None
+    out.append(code[last:])
+    return ''.join(out)
+
+# ===== 基准：旧正则 vs 扫描器 =====
+
+_OLD = re.compile(r'\b([a-zA-Z_][\w\s\*]+?)\s+([a-zA-Z_]\w*)\s*\(')
+
+def _synth_header(n):
+    parts = []
+    for i in range(n):
+        parts.append(f'/* decl {i} */\n'
+                     f'extern unsigned long volatile *fn_{i}(int a, char *b);\n'
+                     f'static inline int helper_{i}(int x) {{ if (x) return g(x); return 0; }}\n'
+                     f'#define MACRO_{i}(x) ((x) + {i})\n'
+                     f'typedef struct s_{i} {{ int a; long b; }} s_{i}_t;\n')
+        if i % 50 == 0:
+            # 长声明串：旧正则在此处大量回溯
+            parts.append(' '.join(f'word{j}' for j in range(400)) + ';\n')
+    return ''.join(parts)
+
+def bench(paths=(), n=2000, rounds=3):
+    if paths:
+        text = ''
+        for p in paths:
+            with open(p, 'r', errors='ignore') as fd:
+                text += fd.read()
+    else:
+        text = _synth_header(n)
+    mb = len(text.encode()) / 1e6
+
+    def run(fn):
+        best = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            r = fn(text)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return best, len(r)
+
+    t_old, n_old = run(_OLD.findall)
+    t_new, n_new = run(parse_funcs)
+    print(f'input: {mb:.2f} MB')
+    print(f'regex  : {mb / t_old:8.2f} MB/s  {n_old} matches')
+    print(f'scanner: {mb / t_new:8.2f} MB/s  {n_new} decls')
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--bench']:
+        bench(sys.argv[2:])
+    else:
+        for p in sys.argv[1:]:
+            with open(p, 'r', errors='ignore') as fd:
+                for d in scan_decls(fd.read()):
+                    print(f'{p}:{d.line}-{d.end} {d.kind} {d.ret} {d.name}')
+                    if d.calls:
+                        print('    -> ' + ' '.join(d.calls))
@@ -0,0 +1,43 @@
+import os
+
+# ===== 源文件读取 =====
+# 每个文件只 read() 一次成 bytes：哈希、include 提取直接在 bytes 上做，
+# 缓存命中时整个文件不会被解码成 str；需要文本时从这份 bytes 解码一次。
+# 不用 mmap：源文件通常只有几 KB，映射的系统调用开销大于一次拷贝；要输出 CODE 的文件也总要整体解码。
+
+def read_bytes(path):
+    """整个文件读成 bytes"""
+    with open(path, 'rb') as fd:
+        return fd.read()
+
+def decode(buf, newlines=False):
+    """UTF-8 解码（忽略非法字节）；newlines=True 时与文本模式 open() 一样统一换行为 '\\n'"""
+    s = str(buf, 'utf-8', 'ignore')
+    if newlines and '\r' in s:
+        s = s.replace('\r\n', '\n').replace('\r', '\n')
+    return s
+
+# ===== 读前过滤 =====
+# 只凭 stat 大小与前 4 KiB 判断，不读全文：超过 max_size 的文件、
+# 含 NUL 字节或以常见二进制魔数开头的文件（ELF、ar、zip、gzip、PNG、PDF）直接跳过。
+
+MAX_FILE_SIZE = 1 << 20
+SNIFF_BYTES = 4096
+BINARY_MAGIC = (b'\x7fELF', b'!<arch>\n', b'PK\x03\x04', b'\x1f\x8b', b'\x89PNG', b'%PDF')
+
+def sniff(path, max_size=None, size=None):
+    """返回跳过原因 'size' / 'binary'；可以读取的文本文件返回 None。size 可传入已有的 stat 结果"""
+    if size is None:
+        size = os.stat(path).st_size
+    if max_size and size > max_size:
+        return 'size'
+    if size == 0:
+        return None
+    with open(path, 'rb') as fd:
+        return sniff_head(fd.read(SNIFF_BYTES))
+
+def sniff_head(head):
+    """按文件开头的字节判断：二进制返回 'binary'，否则返回 None。已读入全文时传 buf[:SNIFF_BYTES]"""
+    if head.startswith(BINARY_MAGIC) or b'\0' in head:
+        return 'binary'
+    return None
@@ -0,0 +1,199 @@
+import os, re, sys
+from collections import namedtuple
+
+# ===== Makefile 构建图 =====
+# 只实现 code/os 下 Makefile 用到的 make 子集，足以得到实际参与编译的单元与编译参数：
+#   变量赋值 = := ::= += ?=（= 为递归展开，其余立即展开）、'\' 续行、# 注释
+#   include / -include / sinclude（与 make 一致，相对顶层 Makefile 所在目录，即模块目录）
+#   ifeq / ifneq / ifdef / ifndef / else / endif
+#   $(X) ${X} 引用；make 函数（addprefix 等）与自动变量展开为空
+# 规则的配方行（Tab 开头）只用来找出其中引用的链接脚本 (*.ld)。
+
+# defines 中值为 None 的是 -U 掉的宏；config 为 Makefile 中出现过的所有 -D 宏名（含未生效分支）
+# files 为实际读到的 Makefile 及其 include（绝对路径），watch 模式据此判断构建图是否要重读
+Build = namedtuple('Build', 'srcs ldscripts include_dirs defines cflags config files')
+
+_ASSIGN = re.compile(r'(?:override\s+|export\s+)?([\w.-]+)\s*(::=|:=|\+=|\?=|=)\s*(.*)$')
+_COND = re.compile(r'(ifeq|ifneq|ifdef|ifndef)\b\s*(.*)$')
+_INCLUDE = re.compile(r'(-?include|sinclude)\s+(.*)$')
+_DEFINE = re.compile(r'-D\s*([A-Za-z_]\w*)')
+
+class Make:
+    def __init__(self, variables=None):
+        # 名称 -> (递归展开?, 值)；variables 相当于命令行上的 VAR=value，优先级最高
+        self.vars = {}
+        self.override = dict(variables or {})
+        self.recipes = []  # 生效的配方行（已展开）
+        self.mentioned = set()  # 出现过的 -D 宏名，不论所在分支是否生效
+        self.files = []  # 读到的文件，按读取顺序
+
+    def get(self, name, depth=0):
+        if name in self.override:
+            return self.override[name]
+        rec = self.vars.get(name)
+        if rec is None:
+            return ''
+        lazy, value = rec
+        return self.expand(value, depth + 1) if lazy else value
+
+    def expand(self, s, depth=0):
+        if '$' not in s or depth > 32:
+            return s
+        out, i, n = [], 0, len(s)
+        while i < n:
+            c = s[i]
+            if c != '$' or i + 1 >= n:
+                out.append(c)
+                i += 1
+                continue
+            o = s[i + 1]
+            if o == '$':
+                out.append('$')
+                i += 2
+            elif o in '({':
+                close = ')' if o == '(' else '}'
+                j, level = i + 2, 1
+                while j < n and level:
+                    if s[j] == o:
+                        level += 1
+                    elif s[j] == close:
+                        level -= 1
+                    j += 1
+                ref = s[i + 2:j - 1]
+                if not re.search(r'[\s,]', ref):
+                    out.append(self.get(self.expand(ref, depth + 1), depth))
+                i = j
+            else:
+                i += 2  # $@ $< $^ 等自动变量
+        return ''.join(out)
+
+    def _cond(self, kind, arg):
+        if kind in ('ifdef', 'ifndef'):
+            defined = bool(self.get(self.expand(arg.strip())))
+            return defined if kind == 'ifdef' else not defined
+        arg = arg.strip()
+        if arg.startswith('('):
+            a, _, b = arg[1:arg.rfind(')')].partition(',')
+        else:
+            parts = re.findall(r'"([^"]*)"|\'([^\']*)\'', arg)
+            a, b = (''.join(p) for p in parts[:2]) if len(parts) >= 2 else ('', '')
+        eq = self.expand(a).strip() == self.expand(b).strip()
+        return eq if kind == 'ifeq' else not eq
+
+    def parse(self, path, base=None, depth=0):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as fd:
+                text = fd.read()
+        except OSError:
+            return False
+        self.files.append(os.path.abspath(path))
+        base = os.path.dirname(path) if base is None else base
+        text = re.sub(r'\\\r?\n[ \t]*', ' ', text)
+
+        stack = []  # [(本层是否生效, 是否已有分支生效)]
+        for line in text.splitlines():
+            self.mentioned.update(_DEFINE.findall(line))
+            active = all(a for a, _ in stack)
+            if line.startswith('\t'):
+                if active:
+                    self.recipes.append(self.expand(line.strip()))
+                continue
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+
+            word = line.split(None, 1)[0]
+            m = _COND.match(line)
+            if m:
+                ok = active and self._cond(*m.groups())
+                stack.append((ok, ok or not active))
+                continue
+            if word == 'else' and stack:
+                _, taken = stack.pop()
+                rest = line[4:].strip()
+                m = _COND.match(rest)
+                ok = not taken and all(a for a, _ in stack) and (not m or self._cond(*m.groups()))
+                stack.append((ok, taken or ok))
+                continue
+            if word == 'endif' and stack:
+                stack.pop()
+                continue
+            if not active:
+                continue
+
+            m = _INCLUDE.match(line)
+            if m and depth < 16:
+                for inc in self.expand(m.group(2)).split():
+                    self.parse(os.path.join(base, inc), base, depth + 1)
+                continue
+
+            m = _ASSIGN.match(line)
+            if m:
+                name, op, value = m.groups()
+                if name in self.override:
+                    continue
+                old = self.vars.get(name)
+                if op == '?=':
+                    if old is None:
+                        self.vars[name] = (True, value)
+                elif op == '=':
+                    self.vars[name] = (True, value)
+                elif op == '+=' and old is not None:
+                    lazy, prev = old
+                    value = value if lazy else self.expand(value)
+                    self.vars[name] = (lazy, f'{prev} {value}' if prev else value)
+                else:
+                    self.vars[name] = (False, self.expand(value))
+        return True
+
+def parse_flags(flags):
+    """从编译参数中取出 -I 目录与 -D/-U 宏定义"""
+    dirs, defines = [], {}
+    toks = iter(flags)
+    for t in toks:
+        for opt in ('-I', '-D', '-U'):
+            if t.startswith(opt):
+                val = t[2:] or next(toks, '')
+                break
+        else:
+            continue
+        if opt == '-I':
+            dirs.append(val)
+        elif opt == '-D':
+            name, _, v = val.partition('=')
+            defines[name] = v if v else '1'
+        else:
+            defines[val] = None
+    return dirs, defines
+
+def parse_makefile(path, variables=None):
+    """解析单个模块的 Makefile（连同其 include），返回 Build；路径均相对 Makefile 所在目录"""
+    mk = Make(variables)
+    if not mk.parse(path):
+        return None
+    srcs = []
+    for name in sorted(mk.vars):
+        if name.startswith('SRCS'):
+            srcs += mk.get(name).split()
+    flags = ' '.join(mk.get(v) for v in ('DEFS', 'CPPFLAGS', 'CFLAGS')).split()
+    dirs, defines = parse_flags(flags)
+    ld = [t for r in mk.recipes for t in r.split() if t.endswith('.ld')]
+    norm = lambda ps: list(dict.fromkeys(os.path.normpath(p) for p in ps))
+    config = mk.mentioned | set(defines)
+    return Build(norm(srcs), norm(ld), norm(dirs), defines, flags, sorted(config),
+                 list(dict.fromkeys(mk.files)))
+
+def load_build(root):
+    """root/Makefile 的构建图；没有 Makefile 时返回 None"""
+    path = os.path.join(root, 'Makefile')
+    return parse_makefile(path) if os.path.isfile(path) else None
+
+if __name__ == '__main__':
+    for d in sys.argv[1:]:
+        b = load_build(d)
+        if b is None:
+            print(f'{d}: 没有 Makefile')
+            continue
+        print(d)
+        for field, value in b._asdict().items():
+            print(f'  {field}: {value}')
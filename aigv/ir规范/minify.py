@@ -0,0 +1,156 @@
+import ast, re, sys, time
+
+# ===== 共享压缩器 =====
+# d.py / ir规范/os.py / 初版/* 共用。所有正则在导入时预编译；
+# 注释、字符串字面量与预处理行在同一次词法扫描中识别，
+# 字符串内容与预处理行的换行不会被后续空白压缩破坏。
+
+OPS = '=+-*/%&|^!<>?:;,(){}[]'
+
+_STR = r'"[^"\\\n]*(?:\\.[^"\\\n]*)*"|\'[^\'\\\n]*(?:\\.[^\'\\\n]*)*\''
+
+# 注释 | 字符串 | 预处理行。每个分支都以 / " ' # 开头且不带命名组，
+# re 可按首字符快速跳过普通代码；种类由首字符区分。
+# 预处理行可带 '\' 续行，行内的注释与字符串整体跳过
+_LEX = re.compile(r'/\*.*?\*/|//[^\n]*|%s|\#(?:[^\n\\/"\']+|\\.|/\*.*?\*/|%s|[/"\'])*'
+                  % (_STR, _STR), re.S)
+_LEX_NOPP = re.compile(r'/\*.*?\*/|//[^\n]*|%s' % _STR, re.S)
+
+_OP_WS = re.compile(r' (?:(?=[%s])|(?<=[%s] ))' % (re.escape(OPS), re.escape(OPS)))
+_NL_WS = re.compile(r' ?\n[\n ]*')
+_SLOT = re.compile(r'\x00(\d+)\x00')
+_DEFINE = re.compile(r'#\s*define\s+(\w+)\s+(?=\()')
+_CONT = re.compile(r'\\\r?\n')
+
+_C_COMMENT = re.compile(r'/\*.*?\*/|//[^\n]*|%s' % _STR, re.S)
+
+def strip_c_comments(s, repl=' '):
+    """移除 // 与 /* */ 注释，字符串字面量内的内容保持不变"""
+    return _C_COMMENT.sub(lambda m: repl if m.group()[0] == '/' else m.group(), s)
+
+def _pack(s, lex):
+    # 一次词法扫描：注释 -> 空白；字符串 / 预处理行 -> 占位符，
+    # 再用 str.split 折叠空白、去掉运算符两侧空格，最后填回占位符
+    slots = []
+
+    def repl(m):
+        c = m.group()[0]
+        if c == '/':
+            return ' '
+        if c == '#':
+            i = m.start()
+            if s[s.rfind('\n', 0, i) + 1:i].strip():
+                return m.group()  # 行中的 '#'（如汇编注释），按普通代码处理
+            slots.append('\n' + _minify_pp(m.group()) + '\n')
+        else:
+            slots.append(m.group())
+        return f'\x00{len(slots) - 1}\x00'
+
+    if '\x00' in s:
+        s = s.replace('\x00', '')
+    out = _OP_WS.sub('', ' '.join(lex.sub(repl, s).split()))
+    if slots:
+        out = _SLOT.sub(lambda m: slots[int(m.group(1))], out)
+    return out
+
+def _minify_pp(line):
+    line = _CONT.sub(' ', line).strip()
+    # '#define F (x)' 与 '#define F(x)' 语义不同，宏名后的空格需保留
+    m = _DEFINE.match(line)
+    if m:
+        return f'#define {m.group(1)} ' + _pack(line[m.end():], _LEX_NOPP)
+    return _pack(line, _LEX_NOPP)
+
+def minify_c(s):
+    """C/汇编/链接脚本通用压缩：去注释，非预处理行合并为一行，压缩运算符两侧空白"""
+    return _NL_WS.sub('\n', _pack(s, _LEX)).strip()
+
+def minify_asm(s):
+    out = []
+    for line in s.splitlines():
+        line = line.rstrip()
+        if not line:
+            continue
+        if line.lstrip().startswith('#'):
+            if line.lstrip().startswith(('#include','#define','#if','#endif','#ifdef','#ifndef')):
+                out.append(line.strip())
+            continue
+        if '#' in line:
+            line = line.split('#', 1)[0].rstrip()
+        if line:
+            out.append(line)
+    return '\n'.join(out)
+
+def minify_python(content):
+    """Python 无法合并行：借助 AST 去掉注释与 docstring"""
+    try:
+        tree = ast.parse(content)
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Module)):
+                if (node.body and isinstance(node.body[0], ast.Expr)
+                        and isinstance(node.body[0].value, ast.Constant)
+                        and isinstance(node.body[0].value.value, str)):
+                    node.body.pop(0)
+        if hasattr(ast, 'unparse'):
+            return ast.unparse(tree)
+    except (SyntaxError, ValueError, RecursionError):
+        pass
+    return content
+
+def minify_code(content, ext):
+    if ext == '.py':
+        return minify_python(content)
+    return minify_c(content)
+
+# ===== 基准：旧多遍正则实现 vs 共享实现 =====
+
+def _legacy_minify_c(s):
+    s = re.sub(r'/\*.*?\*/', '', s, flags=re.S)
+    s = re.sub(r'//.*', '', s)
+    lines, buf = [], []
+    for l in s.splitlines():
+        l = l.strip()
+        if not l:
+            continue
+        if l.startswith('#'):
+            if buf:
+                lines.append(' '.join(buf))
+                buf = []
+            lines.append(l)
+        else:
+            buf.append(l)
+    if buf:
+        lines.append(' '.join(buf))
+    s = '\n'.join(lines)
+    ops = r'=|\+|-|\*|/|%|&|\||\^|!|<|>|\?|:|;|,|\(|\)|\{|\}|\[|\]'
+    return re.sub(f'\\s*({ops})\\s*', r'\1', s)
+
+def bench(paths, rounds=5):
+    text = ''
+    for p in paths:
+        with open(p, 'r', errors='ignore') as fd:
+            text += fd.read()
+    mb = len(text.encode()) / 1e6
+
+    def run(fn):
+        best = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            r = fn(text)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return best, len(r)
+
+    t_old, n_old = run(_legacy_minify_c)
+    t_new, n_new = run(minify_c)
+    print(f'input: {mb:.2f} MB')
+    print(f'legacy : {mb / t_old:8.2f} MB/s  -> {n_old} chars')
+    print(f'shared : {mb / t_new:8.2f} MB/s  -> {n_new} chars')
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--bench']:
+        bench(sys.argv[2:])
+    else:
+        for p in sys.argv[1:]:
+            with open(p, 'r', errors='ignore') as fd:
+                print(minify_c(fd.read()))
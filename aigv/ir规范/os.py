@@ -1,11 +1,33 @@
-import os, re, argparse
+import os, io, re, sys, glob, json, time, shutil, fnmatch, hashlib, tempfile, argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+from functools import partial
+
+from cdecl import scan_decls, skeleton
+from minify import minify_c, minify_asm
+from profiler import Profiler, NOPROF
+from symindex import idents, build_index, save_index
+from fileio import read_bytes, decode, sniff
+from walker import walk
+from makefile import load_build
+from ppcond import prune
+from store import open_store
+from tokens import estimate_tokens
 
 # ===== 基本配置 =====
 SRC_EXT = {'.c', '.h', '.S', '.s', '.ld', 'Makefile'}
-IGN = {'.git', 'build', 'dist', '__pycache__', '.vscode'}
+IGN = {'.git', 'build', 'dist', '__pycache__', '.vscode', '.pir-cache'}
 
 PROFILE = 'os-riscv'
 
+# 分析结果缓存：<root>/.pir-cache/pir.sqlite3（见 store.py），按 (sha256, ext, 宏表指纹) 寻址
+# 条目的 version 与 ANALYZER 不一致视为未命中并覆盖；旧版 v1/<kind>/<sha256>.json 不再读取
+CACHE_DIR = '.pir-cache'
+CACHE_DB = 'pir.sqlite3'
+ANALYZER = 'pir-os-v8'
+
 ARCH_MAP = {
     'core': [],
     'mm': [],
@@ -24,52 +46,14 @@ def classify(path):
             return k
     return 'other'
 
-def strip_c_comments(s):
-    s = re.sub(r'/\*.*?\*/', '', s, flags=re.S)
-    s = re.sub(r'//.*', '', s)
-    return s
-
-def minify_c(s):
-    s = strip_c_comments(s)
-    lines, buf = [], []
-    for l in s.splitlines():
-        l = l.strip()
-        if not l:
-            continue
-        if l.startswith('#'):
-            if buf:
-                lines.append(' '.join(buf))
-                buf = []
-            lines.append(l)
-        else:
-            buf.append(l)
-    if buf:
-        lines.append(' '.join(buf))
-    s = '\n'.join(lines)
-    s = re.sub(r'\s*([=+\-*/%&|^!<>?:;,(){}\[\]])\s*', r'\1', s)
-    return s
-
-def minify_asm(s):
-    out = []
-    for line in s.splitlines():
-        line = line.rstrip()
-        if not line:
-            continue
-        if line.lstrip().startswith('#'):
-            if line.lstrip().startswith(('#include','#define','#if','#endif','#ifdef','#ifndef')):
-                out.append(line.strip())
-            continue
-        if '#' in line:
-            line = line.split('#', 1)[0].rstrip()
-        if line:
-            out.append(line)
-    return '\n'.join(out)
-
-def parse_funcs(s):
-    return re.findall(r'\b([a-zA-Z_][\w\s\*]+?)\s+([a-zA-Z_]\w*)\s*\(', s)
+_INCLUDE = re.compile(r'#include\s+[<"](.+?)[>"]')
+_INCLUDE_B = re.compile(_INCLUDE.pattern.encode())
 
 def parse_includes(s):
-    return re.findall(r'#include\s+[<"](.+?)[>"]', s)
+    """s 可以是 str，也可以是 bytes；后者只解码匹配到的文件名"""
+    if isinstance(s, str):
+        return _INCLUDE.findall(s)
+    return [inc.decode('utf-8', 'ignore') for inc in _INCLUDE_B.findall(s)]
 
 def parse_ld(s):
     entry = None
@@ -79,7 +63,7 @@ def parse_ld(s):
 
     m = re.search(r'ENTRY\s*\(\s*([^)]+)\s*\)', s)
     if m:
-        entry = m.group(1)
+        entry = m.group(1).strip()
 
     m = re.search(r'\.\s*=\s*(0x[0-9a-fA-F]+)', s)
     if m:
@@ -96,115 +80,722 @@ def parse_ld(s):
 
     return entry, base, sections, sorted(set(symbols))
 
+# 汇编调用边：在压缩后的代码上逐行扫描，调用者为最近的标号，被调者为 call/tail/jal 的目标。
+# j / jal zero 只有跳出本文件时才算（尾调用，如 j start_kernel）；跳到本文件标号的是
+# 函数内的分支（如 park: wfi; j park），不算调用。指向调用者自身的边一律丢弃
+_ASM_CALL = re.compile(r'^\s*(?:([A-Za-z_.$][\w.$]*):)?\s*'
+                       r'(?:(call|tail|jal|j)\s+(?:([a-z]\w*)\s*,\s*)?([A-Za-z_.$][\w.$]*)\s*$)?', re.M)
+
+def asm_calls(code):
+    found = [m.groups() for m in _ASM_CALL.finditer(code)]
+    local = {label for label, _, _, _ in found if label}
+    calls = []
+    caller = None
+    for label, op, rd, target in found:
+        if label:
+            caller = label
+        if not target or not caller or target == caller:
+            continue
+        jump = op == 'j' or (op == 'jal' and rd in ('zero', 'x0'))
+        if jump and target in local:
+            continue
+        if [caller, target] not in calls:
+            calls.append([caller, target])
+    return calls
+
+# ===== 单文件分析 =====
+
+# 经过 C 预处理器的类型（.ld 由 Makefile 以 -x c 预处理）
+PP_EXT = ('.c', '.h', '.S', '.ld')
+
+def analyze(buf, ext, prof=NOPROF, defines=None):
+    """
+    buf 为 str 或 bytes：include 在字节层面提取，只有需要压缩 / 解析的类型才解码全文，
+    这些类型的声明扫描与压缩仍在解码后的 str 上进行。
+    defines 不为 None 时先按其裁掉不生效的条件分支，之后的 include / 符号 / 压缩都只看生效部分
+    """
+    n = len(buf)
+    if defines is not None and ext in PP_EXT:
+        if not isinstance(buf, str):
+            with prof.stage('decode', ext, n):
+                buf = decode(buf)
+        with prof.stage('prune', ext, n):
+            buf = prune(buf, defines)
+    with prof.stage('parse_includes', ext, n):
+        deps = [f'include:[{inc}]' for inc in parse_includes(buf)]
+    symbols = []
+    calls = []
+    layout = None
+    code = ''
+
+    if ext in ('.c', '.h', '.S', '.s', '.ld') and not isinstance(buf, str):
+        with prof.stage('decode', ext, n):
+            raw = decode(buf)
+    else:
+        raw = buf
+
+    if ext in ('.c', '.h'):
+        with prof.stage('scan_decls', ext, n):
+            for d in scan_decls(raw):
+                symbols.append({'attrs': {'decl': d.kind, 'lines': [d.line, d.end]},
+                                'kind': 'func', 'name': d.name})
+                calls.extend([d.name, c] for c in d.calls)
+        with prof.stage('minify_c', ext, n):
+            code = minify_c(raw)
+    elif ext in ('.S', '.s'):
+        with prof.stage('minify_asm', ext, n):
+            code = minify_asm(raw)
+        with prof.stage('asm_calls', ext, n):
+            calls = asm_calls(code)
+    elif ext == '.ld':
+        with prof.stage('parse_ld', ext, n):
+            entry, base, secs, syms = parse_ld(raw)
+        layout = {'entry': entry, 'base': base, 'sections': secs}
+        for s in syms:
+            symbols.append({'attrs': {}, 'kind': 'ld', 'name': s})
+
+    return {'deps': deps, 'symbols': symbols, 'calls': calls, 'layout': layout, 'code': code}
+
+# ===== 缓存 =====
+
+@contextmanager
+def open_cache(root, cache):
+    """cache 为 True（<root>/.pir-cache）/ 目录 / False；产出 Store，不使用缓存时为 None"""
+    d = os.path.join(root, CACHE_DIR) if cache is True else cache
+    store = open_store(d, CACHE_DB) if d else None
+    try:
+        yield store
+    finally:
+        if store:
+            store.close()
+
+def defines_key(defines):
+    """宏表指纹：裁剪结果随宏表变化，缓存与 memo 的键都要带上它；不裁剪时为空串"""
+    if defines is None:
+        return ''
+    return hashlib.sha256(json.dumps(sorted(defines.items())).encode()).hexdigest()[:12]
+
+def file_digest(p, cache=None):
+    """文件的 sha256；stat 与存储中的记录一致时直接取记录，不读文件"""
+    digest = cache.digest(p) if cache else None
+    if digest is None:
+        digest = hashlib.sha256(read_bytes(p)).hexdigest()
+        if cache:
+            cache.stamp(p, digest)
+    return digest
+
+def _cached(digest, ext, dkey, cache, memo, prof=NOPROF):
+    # 同一次运行内相同内容只分析一次；其次查存储
+    key = (digest, ext, dkey)
+    if memo is not None and key in memo:
+        return memo[key]
+    if not cache:
+        return None
+    with prof.stage('cache_load', ext):
+        ent = cache.get(digest, ext, dkey, ANALYZER)
+    if ent and memo is not None:
+        memo[key] = ent
+    return ent
+
+def _finish(ent, rp, ext, module, digest, dkey, cache=None, memo=None, prof=NOPROF):
+    ent.update({
+        'file': rp,
+        'hash': digest,
+        'lang': ext.upper().strip('.'),
+        'timestamp': datetime.now().isoformat(),
+        'unit': {'module': module, 'role': 'lib'},
+        'version': ANALYZER,
+    })
+    if cache:
+        with prof.stage('cache_store', ext):
+            cache.put(ent, ext, dkey)
+    if memo is not None:
+        memo[digest, ext, dkey] = ent
+    return ent
+
+def load_unit(p, rp, ext, module, cache=None, memo=None, prof=NOPROF, defines=None):
+    # stat 与存储中的记录一致时直接用记录的哈希，命中缓存时文件不会被读取
+    dkey = defines_key(defines)
+    digest = cache.digest(p) if cache else None
+    if digest:
+        ent = _cached(digest, ext, dkey, cache, memo, prof)
+        if ent:
+            return ent
+
+    # 哈希与 include 提取直接作用于读入的 bytes
+    buf = read_bytes(p)
+    if digest is None:
+        with prof.stage('read', ext, len(buf)):
+            digest = hashlib.sha256(buf).hexdigest()
+        if cache:
+            cache.stamp(p, digest)
+        ent = _cached(digest, ext, dkey, cache, memo, prof)
+        if ent:
+            return ent
+    ent = analyze(buf, ext, prof, defines)
+    return _finish(ent, rp, ext, module, digest, dkey, cache, memo, prof)
+
+def analyze_file(p, ext, defines=None):
+    """进程池中执行的部分：只做分析，不碰缓存"""
+    return analyze(read_bytes(p), ext, defines=defines)
+
+# ===== include 解析 =====
+
+def resolve_includes(includes, unit_id, include_dirs=()):
+    """include 目标解析为 uX：先相对包含者所在目录，再依次查 include_dirs"""
+    edges = []
+    for src, inc in includes:
+        if src not in unit_id:
+            continue
+        dst = None
+        for d in (os.path.dirname(src), *include_dirs):
+            rp = os.path.normpath(os.path.join(d, inc))
+            if rp in unit_id:
+                dst = unit_id[rp]
+                break
+        edges.append((unit_id[src], inc, dst))
+    return edges
+
+def dep_closure(edges):
+    """传递依赖与反向依赖索引：deps[u] = u 间接包含的单元，rdeps[u] = 受 u 影响的单元"""
+    fwd = defaultdict(set)
+    for src, _, dst in edges:
+        if dst and dst != src:
+            fwd[src].add(dst)
+
+    deps = {}
+    for u in fwd:
+        seen, todo = set(), list(fwd[u])
+        while todo:
+            v = todo.pop()
+            if v not in seen and v != u:
+                seen.add(v)
+                todo.extend(fwd.get(v, ()))
+        deps[u] = seen
+
+    rdeps = defaultdict(set)
+    for u, ds in deps.items():
+        for d in ds:
+            rdeps[d].add(u)
+    return deps, rdeps
+
+def _uid_key(u):
+    return int(u[1:])
+
+# ===== token 预算 =====
+
+ASM_LABEL = re.compile(r'^\s*([A-Za-z_.$][\w.$]*):', re.M)
+
+def rank_units(units, edges, symbols, layouts, labels, ntok):
+    """CODE 保留优先级：LAYOUT ENTRY 所在单元 > GRAPH 入度 > 符号密度"""
+    entries = {entry for entry, _, _ in layouts if entry}
+
+    indeg = Counter(dst for _, _, dst in edges if dst)
+
+    names = defaultdict(set)
+    for name, u, _ in symbols:
+        names[u].add(name)
+
+    score = {}
+    for u, _, _, _ in units:
+        is_entry = bool(entries & (names[u] | labels.get(u, set())))
+        score[u] = (is_entry, indeg[u], len(names[u]) / max(ntok.get(u, 1), 1))
+    return score
+
+def select_code(blocks, budget, score):
+    """按优先级贪心挑选放得下的 CODE 块；uX=uY 引用行随其规范单元保留"""
+    kept = set()
+    used = 0
+    for u, ref, _, _, n in sorted((b for b in blocks if b[0] == b[1]),
+                                  key=lambda b: score.get(b[0], ()), reverse=True):
+        if used + n <= budget:
+            kept.add(u)
+            used += n
+    for u, ref, _, _, n in blocks:
+        if u != ref and ref in kept and used + n <= budget:
+            kept.add(u)
+            used += n
+    return kept
+
 # ===== 主流程 =====
 
-def main(root, out):
+def walk_sources(root, gitignore=True, git=False):
+    for r, ds, fs in walk(root, IGN, gitignore=gitignore, git=git):
+        for f in fs:
+            if f.endswith(tuple(SRC_EXT)):
+                yield os.path.join(r, f), f
+
+def load_units(files, module, cache, jobs, memo=None, prof=NOPROF, defines=None):
+    """
+    按 files 顺序逐个产出分析结果；jobs>1 时父进程先查缓存，
+    只把未命中的唯一内容分发到进程池，结果回到父进程统一写入存储。
+    进程池的结果按 files 顺序边到边产出；memo 为 None 时（--stream）
+    只暂存后面还有同内容文件要用的结果，内存不随文件数增长。
+    module 为模块名，或 {路径: 模块名}（批量模式下多个模块的文件合并分析）
+    """
+    modname = module.get if isinstance(module, dict) else lambda p: module
+    if jobs <= 1 or len(files) < 2:
+        for p, rp, ext in files:
+            with prof.file(rp):
+                ent = load_unit(p, rp, ext, modname(p), cache, memo, prof, defines)
+            yield ent
+        return
+
+    dkey = defines_key(defines)
+    keys, todo = [], {}  # todo: 未命中的 (hash, ext, dkey) -> files 中首个该内容的文件
+    for p, rp, ext in files:
+        key = (file_digest(p, cache), ext, dkey)
+        keys.append(key)
+        if key in todo or memo is not None and key in memo:
+            continue
+        if not (cache and cache.has(*key, ANALYZER)):
+            todo[key] = (p, rp, ext)
+
+    # todo 按首次出现的顺序排列，与按 files 顺序取用结果的顺序一致
+    left = Counter(k for k in keys if k in todo)  # 本次分析的内容还剩几个文件要用
+    done = {}
+    with ExitStack() as stack:
+        if todo:
+            ps, rps, exts = zip(*todo.values())
+            chunk = max(1, len(todo) // (jobs * 4))
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+            results = zip(todo.items(), pool.map(partial(analyze_file, defines=defines), ps, exts, chunksize=chunk))
+        for (p, rp, ext), key in zip(files, keys):
+            if key in left:
+                if key not in done:
+                    ((digest, _, _), (fp, frp, _)), ent = next(results)
+                    done[key] = _finish(ent, frp, ext, modname(fp), digest, dkey, cache, memo)
+                ent = done[key]
+                left[key] -= 1
+                if not left[key]:
+                    del left[key], done[key]
+            else:
+                # 查询后条目被并发的写入替换时退回单文件路径
+                ent = _cached(*key, cache, memo) or load_unit(p, rp, ext, modname(p), cache, memo, prof, defines)
+            yield ent
+
+def build(root, out, files, ents, dedup=False, stream=False, max_tokens=None,
+          include_dirs=(), resolve=False, closure=False, calls=False, index=None,
+          code_level='full', expand=(), prof=NOPROF):
+    """
+    按 files 顺序合并单元分析结果并写出 PIR（先写临时文件再原子替换）
+    code_level='skeleton' 时 C 单元的函数体折叠为 {...}；路径匹配 expand 中任一 glob 的单元仍完整输出
+    """
     units = []
     graph = []
     symbols = []
     layouts = []
-    code = []
+
+    # CODE 正文按单元顺序写入 sink，最后整体拷贝到输出；
+    # stream 模式下 sink 为临时文件，内存不随源码总量增长
+    code = tempfile.TemporaryFile('w+', encoding='utf-8') if stream else io.StringIO()
+    blocks = []  # (u, ref, pos, size, tokens)：sink 中每个 CODE 块的位置
+    labels = {}  # 汇编单元的标号，用于定位 ENTRY
 
     unit_id = {}
     uid = 0
 
     includes = []
 
-    # ===== 扫描源文件 =====
-    for r, ds, fs in os.walk(root):
-        ds[:] = [d for d in ds if d not in IGN]
-        for f in fs:
-            if not f.endswith(tuple(SRC_EXT)):
-                continue
+    canon = {}  # (hash, ext, 详略) -> 首个出现该内容的 unit；不同类型的压缩方式不同，不能互相引用
+
+    defs = []  # 符号索引：(name, u, kind, decl, lines)
+    edges_call = []  # 调用边：(caller, u, callee)
+    known = set()    # 可作为被调者的名字：C 函数定义与汇编标号
+    uses = {}  # 符号索引：u -> CODE 中出现的标识符
 
-            p = os.path.join(r, f)
-            rp = os.path.relpath(p, root)
-            arch = 'link' if f.endswith('.ld') else classify(rp)
-            ext = os.path.splitext(f)[1]
+    for (p, rp, ext), ent in zip(files, ents):
+        with prof.stage('merge', ext):
+            arch = 'link' if ext == '.ld' else classify(rp)
 
             u = f'u{uid}'
             unit_id[rp] = u
             units.append((u, rp, ext.upper().strip('.'), arch))
-            ARCH_MAP[arch].append(u)
             uid += 1
 
-            with open(p, 'r', errors='ignore') as fd:
-                raw = fd.read()
-
             # include 依赖
-            for inc in parse_includes(raw):
-                includes.append((rp, inc))
+            for dep in ent['deps']:
+                if dep.startswith('include:'):
+                    includes.append((rp, dep[len('include:['):-1]))
 
             # 符号
-            if ext in ('.c', '.h'):
-                for (_, name) in parse_funcs(raw):
-                    symbols.append((name, u, 'func'))
+            for sym in ent['symbols']:
+                symbols.append((sym['name'], u, sym['kind']))
+                if calls and sym['attrs'].get('decl') == 'def':
+                    known.add(sym['name'])
+                if index:
+                    attrs = sym['attrs']
+                    defs.append((sym['name'], u, sym['kind'], attrs.get('decl'), attrs.get('lines')))
 
             # 代码最小证据
-            if ext in ('.S', '.s'):
-                code.append((u, minify_asm(raw)))
-            elif ext in ('.c', '.h'):
-                code.append((u, minify_c(raw)))
-            elif ext == '.ld':
-                entry, base, secs, syms = parse_ld(raw)
-                layouts.append((entry, base, secs))
-                for s in syms:
-                    symbols.append((s, u, 'ld'))
+            if ext in ('.S', '.s', '.c', '.h'):
+                c = ent['code']
+                full = c
+                level = code_level
+                if level == 'skeleton' and ext in ('.c', '.h') and c \
+                        and not any(fnmatch.fnmatch(rp, g) for g in expand):
+                    with prof.stage('skeleton', ext, len(c)):
+                        c = skeleton(c)
+                else:
+                    level = 'full'
+                ref = canon.setdefault((ent['hash'], ext, level), u) if dedup else u
+                if c.strip():
+                    blk = f'{u}={ref}\n' if ref != u else f'<{u}>\n{c}\n</{u}>\n'
+                    blocks.append((u, ref, code.tell(), len(blk), estimate_tokens(blk)))
+                    code.write(blk)
+                    if ext in ('.S', '.s'):
+                        labels[u] = set(ASM_LABEL.findall(c))
+                        if calls:
+                            known |= labels[u]
+                    if index:
+                        uses[u] = idents(full)
+                if calls:
+                    edges_call.extend((caller, u, callee) for caller, callee in ent['calls'])
+            elif ent['layout']:
+                lay = ent['layout']
+                layouts.append((lay['entry'], lay['base'], lay['sections']))
 
     # ===== 构建 GRAPH =====
-    for src, inc in includes:
-        if src in unit_id:
-            graph.append(f"{unit_id[src]}->include:{inc}")
+    with prof.stage('resolve_includes', nbytes=len(includes)):
+        edges = resolve_includes(includes, unit_id, include_dirs)
+    for src, inc, dst in edges:
+        graph.append(f"{src}->include:{dst if resolve and dst else inc}")
+
+    if index:
+        with prof.stage('index'):
+            save_index(build_index([(u, rp) for u, rp, _, _ in units], defs, uses, edges), index)
 
     # ===== 输出 PIR =====
-    with open(out, 'w') as o:
-        o.write('<PIR>\n')
-
-        # META
-        o.write('<META>\n')
-        o.write(f'name:{os.path.basename(root)}\n')
-        o.write(f'root:{os.path.abspath(root)}\n')
-        o.write(f'profile:{PROFILE}\n')
-        o.write('lang:C,ASM,LD\n')
-        o.write('</META>\n\n')
-
-        # UNITS
-        o.write('<UNITS>\n')
-        for u, path, typ, arch in units:
-            o.write(f'{u}:{path} type={typ} arch={arch}\n')
-        o.write('</UNITS>\n\n')
-
-        # GRAPH
-        o.write('<GRAPH>\n')
-        for g in graph:
-            o.write(g + '\n')
-        o.write('</GRAPH>\n\n')
-
-        # SYMBOLS
-        o.write('<SYMBOLS>\n')
-        for name, u, role in sorted(set(symbols)):
-            o.write(f'{name}:{u} {role}\n')
-        o.write('</SYMBOLS>\n\n')
-
-        # LAYOUT
-        o.write('<LAYOUT>\n')
-        for entry, base, secs in layouts:
-            if entry:
-                o.write(f'ENTRY={entry}\n')
-            if base:
-                o.write(f'BASE={base}\n')
-            for sec, parts in secs:
-                o.write(f'.{sec}:' + ' '.join(parts) + '\n')
-        o.write('</LAYOUT>\n\n')
+    t0 = time.perf_counter()
+    head = io.StringIO()
+    head.write('<PIR>\n')
+
+    # META
+    head.write('<META>\n')
+    head.write(f'name:{os.path.basename(root)}\n')
+    head.write(f'root:{os.path.abspath(root)}\n')
+    head.write(f'profile:{PROFILE}\n')
+    head.write('lang:C,ASM,LD\n')
+    head.write('</META>\n\n')
+
+    # UNITS
+    head.write('<UNITS>\n')
+    for u, path, typ, arch in units:
+        head.write(f'{u}:{path} type={typ} arch={arch}\n')
+    head.write('</UNITS>\n\n')
+
+    # GRAPH
+    head.write('<GRAPH>\n')
+    for g in graph:
+        head.write(g + '\n')
+    head.write('</GRAPH>\n\n')
+
+    # DEPS（扩展区块）：uX deps=<传递包含> rdeps=<受影响单元>
+    if closure:
+        with prof.stage('dep_closure'):
+            deps, rdeps = dep_closure(edges)
+        head.write('<DEPS>\n')
+        for u in sorted(set(deps) | set(rdeps), key=_uid_key):
+            d = ','.join(sorted(deps.get(u, ()), key=_uid_key))
+            r = ','.join(sorted(rdeps.get(u, ()), key=_uid_key))
+            head.write(f'{u} deps={d} rdeps={r}\n')
+        head.write('</DEPS>\n\n')
+
+    # SYMBOLS
+    head.write('<SYMBOLS>\n')
+    for name, u, role in sorted(set(symbols)):
+        head.write(f'{name}:{u} {role}\n')
+    head.write('</SYMBOLS>\n\n')
+
+    # CALLS（扩展区块）：caller:uX->callee，只保留被调者在项目内有定义的边
+    if calls:
+        head.write('<CALLS>\n')
+        for caller, u, callee in dict.fromkeys(edges_call):
+            if callee in known:
+                head.write(f'{caller}:{u}->{callee}\n')
+        head.write('</CALLS>\n\n')
+
+    # LAYOUT
+    head.write('<LAYOUT>\n')
+    for entry, base, secs in layouts:
+        if entry:
+            head.write(f'ENTRY={entry}\n')
+        if base:
+            head.write(f'BASE={base}\n')
+        for sec, parts in secs:
+            head.write(f'.{sec}:' + ' '.join(parts) + '\n')
+    head.write('</LAYOUT>\n\n')
+    head = head.getvalue()
+    prof.add('head', time.perf_counter() - t0, nbytes=len(head))
+
+    keep = None
+    if max_tokens:
+        with prof.stage('budget'):
+            ntok = {u: n for u, _, _, _, n in blocks}
+            score = rank_units(units, edges, symbols, layouts, labels, ntok)
+            budget = max_tokens - estimate_tokens(head) - estimate_tokens('<CODE>\n</CODE>\n</PIR>\n')
+            keep = select_code(blocks, budget, score)
+
+    t0 = time.perf_counter()
+    tmp = f'{out}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as o:
+        o.write(head)
 
         # CODE
         o.write('<CODE>\n')
-        for u, c in code:
-            if c.strip():
-                o.write(f'<{u}>\n{c}\n</{u}>\n')
+        code.seek(0)
+        if keep is None:
+            shutil.copyfileobj(code, o)
+        else:
+            for u, _, pos, size, _ in blocks:
+                if u in keep:
+                    code.seek(pos)
+                    o.write(code.read(size))
+        code.close()
         o.write('</CODE>\n')
 
         o.write('</PIR>\n')
+        size = o.tell()
+    os.replace(tmp, out)
+    prof.add('write', time.perf_counter() - t0, nbytes=size)
+
+def scan_files(root, gitignore=True, git=False):
+    return [(p, os.path.relpath(p, root), os.path.splitext(f)[1])
+            for p, f in walk_sources(root, gitignore, git)]
+
+def check_file(p, max_size=None, cache=None, st=None):
+    """
+    读前检查，返回跳过原因或 None。超大只看 stat；文件头检查的结论记入存储，
+    stat 与记录一致时直接取结论，不再打开文件
+    """
+    st = st or os.stat(p)
+    if max_size and st.st_size > max_size:
+        return 'size'
+    why = cache.verdict(p, st) if cache else None
+    if why is None:
+        why = sniff(p, None, st.st_size) or ''
+        if cache:
+            cache.sniffed(p, st, why)
+    return why or None
+
+def filter_files(files, max_size=None, skipped=None, cache=None):
+    """读全文之前按 stat 大小与文件头剔除超大 / 二进制文件；剔除的 (rp, 原因) 追加到 skipped"""
+    kept = []
+    for f in files:
+        try:
+            why = check_file(f[0], max_size, cache)
+        except OSError:
+            why = 'unreadable'
+        if why:
+            if skipped is not None:
+                skipped.append((f[1], why))
+        else:
+            kept.append(f)
+    return kept
+
+def select_built(files, bg, include_dirs=()):
+    """只保留构建图中参与编译的单元、链接脚本，以及从它们经 include 可达的头文件"""
+    by_rp = {rp: p for p, rp, _ in files}
+    names = {rp: rp for rp in by_rp}
+    todo = [rp for rp in (*bg.srcs, *bg.ldscripts) if rp in by_rp]
+    keep = set(todo)
+    while todo:
+        rp = todo.pop()
+        incs = parse_includes(read_bytes(by_rp[rp]))
+        for _, _, dst in resolve_includes([(rp, inc) for inc in incs], names, include_dirs):
+            if dst and dst not in keep:
+                keep.add(dst)
+                todo.append(dst)
+    return [f for f in files if f[1] in keep]
+
+def apply_build(root, files, opts, built_only=False, prof=NOPROF):
+    """
+    读取 root/Makefile 构建图：其 -I 目录并入 include_dirs；
+    built_only 时只分析实际编译的单元及其可达头文件。返回 (files, opts, 构建图)，
+    没有 Makefile 时构建图为 None，files 与 opts 原样返回
+    """
+    with prof.stage('makefile'):
+        bg = load_build(root)
+    if bg is None:
+        return files, opts, None
+    dirs = [*opts.get('include_dirs', ()), *bg.include_dirs]
+    opts = dict(opts, include_dirs=dirs)
+    if built_only:
+        with prof.stage('select_built'):
+            files = select_built(files, bg, dirs)
+    return files, opts, bg
+
+def module_defines(bg, extra=None):
+    """
+    条件裁剪用的宏表：Makefile 中出现过的 -D 宏（含未生效分支中的）默认视为未定义，
+    再叠加实际生效的 -D/-U 与命令行 --define/--undef；其余宏未知，相关条件原样保留
+    """
+    defines = {}
+    if bg is not None:
+        defines.update(dict.fromkeys(bg.config))
+        defines.update(bg.defines)
+    defines.update(extra or {})
+    return defines
+
+def main(root, out, cache=True, jobs=1, prof=NOPROF, max_size=None, gitignore=True, git=False,
+         built_only=False, prune=False, defines=None, **opts):
+    module = os.path.basename(os.path.abspath(root))
+    skipped = []
+
+    with prof, open_cache(root, cache) as cache:
+        # ===== 扫描源文件 =====
+        with prof.stage('walk'):
+            files = scan_files(root, gitignore, git)
+        with prof.stage('sniff'):
+            files = filter_files(files, max_size, skipped, cache)
+        files, opts, bg = apply_build(root, files, opts, built_only, prof)
+        pp = module_defines(bg, defines) if prune else None
+        ents = load_units(files, module, cache, jobs, None if opts.get('stream') else {}, prof, pp)
+        build(root, out, files, ents, prof=prof, **opts)
+
+    for rp, why in skipped:
+        print(f'跳过 {rp}: {why}', file=sys.stderr)
+
+# ===== 批量模式 =====
+
+def batch(parent, pattern, out_dir, cache=True, jobs=1, prof=NOPROF, max_size=None,
+          gitignore=True, git=False, built_only=False, prune=False, defines=None, index=None,
+          **opts):
+    """
+    parent 下每个匹配 pattern 的子目录各生成一个 PIR (<out_dir>/<模块名>.pir)。
+    所有模块在同一进程内先统一扫描，内容相同 (hash, ext) 的文件只分析一次；
+    jobs>1 时把这些唯一内容分发到进程池，合并结果后逐个模块 build
+    """
+    mods = sorted(d for d in glob.glob(os.path.join(parent, pattern)) if os.path.isdir(d))
+    os.makedirs(out_dir, exist_ok=True)
+    skipped = []
+
+    with prof, open_cache(parent, cache) as cache:
+        scans = []
+        for m in mods:
+            name = os.path.basename(m)
+            sk = []
+            with prof.stage('walk'):
+                files = scan_files(m, gitignore, git)
+            with prof.stage('sniff'):
+                files = filter_files(files, max_size, sk, cache)
+            skipped += [(os.path.join(name, rp), why) for rp, why in sk]
+            files, mopts, bg = apply_build(m, files, opts, built_only, prof)
+            pp = module_defines(bg, defines) if prune else None
+            scans.append((m, name, files, mopts, pp))
+
+        # ===== 跨模块合并分析 =====
+        memo = {}  # (hash, ext, 宏表指纹) -> 分析结果，所有模块共用
+        got = {}   # 并行时：(path, 宏表指纹) -> 分析结果
+        if jobs > 1:
+            # 宏表相同的模块合成一组交给 load_units，唯一的未命中内容一起分发到进程池；
+            # 每个文件仍记自己所在的模块，与串行路径一致
+            groups = {}
+            for m, _, files, _, pp in scans:
+                module = os.path.basename(os.path.abspath(m))
+                items, mods = groups.setdefault(defines_key(pp), (pp, [], {}))[1:]
+                items.extend(files)
+                mods.update((p, module) for p, _, _ in files)
+            for dkey, (pp, items, mods) in groups.items():
+                ents = load_units(items, mods, cache, jobs, memo, prof, pp)
+                got.update(((p, dkey), ent) for (p, _, _), ent in zip(items, ents))
+
+        for m, name, files, mopts, pp in scans:
+            if jobs > 1:
+                ents = [got[p, defines_key(pp)] for p, _, _ in files]
+            else:
+                module = os.path.basename(os.path.abspath(m))
+                ents = load_units(files, module, cache, 1, memo, prof, pp)
+            idx = os.path.join(out_dir, name + '.idx.json') if index is not None else None
+            build(m, os.path.join(out_dir, name + '.pir'), files, ents, index=idx, prof=prof, **mopts)
+
+    for rp, why in skipped:
+        print(f'跳过 {rp}: {why}', file=sys.stderr)
+    return [name for _, name, _, _, _ in scans]
+
+# ===== watch 模式 =====
+
+def _stamps(paths):
+    """{路径: (mtime_ns, size)}，不存在的文件为 None"""
+    out = {}
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out[p] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            out[p] = None
+    return out
+
+def _build_stamps(root, bg):
+    """构建图读到的全部文件（含 ../common.mk 等 include）的 stat；没有 Makefile 时等它出现"""
+    return _stamps(bg.files if bg else [os.path.join(os.path.abspath(root), 'Makefile')])
+
+def watch(root, out, cache=True, interval=0.5, max_size=None, gitignore=True, git=False,
+          built_only=False, prune=False, defines=None, **opts):
+    """
+    常驻进程：每个单元的分析结果保存在内存中，按 (mtime, size) 轮询，
+    只重新分析变化的文件，然后原子地重写输出。仅依赖标准库
+    """
+    module = os.path.basename(os.path.abspath(root))
+    state = {}  # path -> ((mtime_ns, size), ent)；被 sniff 剔除的文件 ent 为 None
+    bg = load_build(root)
+    pp = module_defines(bg, defines) if prune else None
+    mks = _build_stamps(root, bg)
+
+    with open_cache(root, cache) as cache:
+        while True:
+            t0 = time.perf_counter()
+            files, fresh, changed = [], {}, []
+            for p, rp, ext in scan_files(root, gitignore, git):
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue  # 扫描与 stat 之间被删除，下一轮再看
+                key = (st.st_mtime_ns, st.st_size)
+                old = state.get(p)
+                if old and old[0] == key:
+                    fresh[p] = old
+                else:
+                    try:
+                        ent = None
+                        if not check_file(p, max_size, cache, st):
+                            ent = load_unit(p, rp, ext, module, cache, defines=pp)
+                    except OSError:
+                        continue
+                    fresh[p] = (key, ent)
+                    changed.append(rp)
+                if fresh[p][1] is not None:
+                    files.append((p, rp, ext))
+
+            now = _stamps(mks)
+            if now != mks:
+                bg = load_build(root)
+                for p in mks:
+                    rp = os.path.relpath(p, root)
+                    if now[p] != mks[p] and rp not in changed:
+                        changed.append(rp)
+                mks = _build_stamps(root, bg)
+                new = module_defines(bg, defines) if prune else None
+                if new != pp and state:
+                    # 宏表变化：所有单元的裁剪结果都可能不同，立即全部重新分析
+                    pp, state = new, {}
+                    continue
+
+            removed = state.keys() - fresh.keys()
+            if changed or removed or not state:
+                # Makefile 与源文件的 include 都可能变化，构建图每次重建时重新读取
+                files, bopts, _ = apply_build(root, files, opts, built_only)
+                build(root, out, files, [fresh[p][1] for p, _, _ in files], **bopts)
+                if cache:
+                    cache.flush()
+                dt = (time.perf_counter() - t0) * 1000
+                what = ', '.join(changed[:3]) + (' ...' if len(changed) > 3 else '')
+                if removed:
+                    what = (what + '; ' if what else '') + f'删除 {len(removed)} 个文件'
+                print(f'[watch] {out} 已更新 {dt:.1f} ms: {what}', flush=True)
+            state = fresh
+
+            time.sleep(interval)
 
 # ===== CLI =====
 
@@ -212,5 +803,99 @@ if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument('dir')
     ap.add_argument('-o', default='pir.txt')
+    ap.add_argument('--cache-dir', default=None,
+                    help=f'缓存目录，其中的 {CACHE_DB} 保存全部分析结果 (默认: <dir>/{CACHE_DIR})')
+    ap.add_argument('--no-cache', action='store_true')
+    ap.add_argument('--dedup', action='store_true',
+                    help='内容相同的单元在 CODE 中只输出一次，其余写作 uX=uY 引用')
+    ap.add_argument('--stream', action='store_true',
+                    help='CODE 正文先落盘到临时文件，峰值内存与项目大小无关')
+    ap.add_argument('-I', '--include-dir', action='append', default=[],
+                    help='include 搜索目录 (相对 dir)，可重复')
+    ap.add_argument('--resolve-includes', action='store_true',
+                    help='GRAPH 中可解析的 include 目标写作 uX')
+    ap.add_argument('--closure', action='store_true',
+                    help='额外输出 <DEPS> 区块：传递依赖与反向依赖索引')
+    ap.add_argument('--calls', action='store_true',
+                    help='输出 <CALLS> 扩展区块：C 函数体与汇编 call/tail/jal 及跳出本文件的 j 的调用边')
+    ap.add_argument('--code', choices=('full', 'skeleton'), default='full',
+                    help='CODE 详略：skeleton 时 .c/.h 只保留原型、类型、宏与全局声明，函数体折叠为 {...}')
+    ap.add_argument('--expand', action='append', default=[], metavar='GLOB',
+                    help='--code=skeleton 时仍完整输出的单元（相对路径 glob，可多次指定）')
+    ap.add_argument('--index', nargs='?', const='', default=None, metavar='FILE',
+                    help='同时写出符号索引 (默认: <输出名>.idx.json)，供 pir.py query 使用')
+    ap.add_argument('--max-tokens', type=int, default=None,
+                    help='总 token 预算：META/UNITS/GRAPH/SYMBOLS/LAYOUT 完整保留，CODE 按优先级裁剪')
+    ap.add_argument('-j', '--jobs', type=int, default=1,
+                    help='并行分析的进程数 (0 = CPU 核数)')
+    ap.add_argument('--watch', action='store_true',
+                    help='常驻监视 dir，文件变化时增量重新生成输出')
+    ap.add_argument('--interval', type=float, default=0.5,
+                    help='watch 模式的轮询间隔 (秒)')
+    ap.add_argument('--max-file-size', type=int, default=None, metavar='BYTES',
+                    help='跳过超过此大小的源文件 (默认不限)；二进制文件总是跳过')
+    ap.add_argument('--batch', metavar='GLOB', default=None,
+                    help='批量模式：dir 为父目录，每个匹配 GLOB 的子目录各输出一个 PIR')
+    ap.add_argument('--out-dir', default='.',
+                    help='批量模式的输出目录，文件名为 <模块名>.pir (默认: 当前目录)')
+    ap.add_argument('--built-only', action='store_true',
+                    help='只分析模块 Makefile 中实际编译的源文件、链接脚本及其可达头文件')
+    ap.add_argument('--prune', action='store_true',
+                    help='按 Makefile 中的 -D（含 defines.mk）裁掉不生效的 #if/#ifdef 分支')
+    ap.add_argument('-D', '--define', action='append', default=[], metavar='NAME[=VAL]',
+                    help='追加宏定义，隐含 --prune（可多次指定）')
+    ap.add_argument('-U', '--undef', action='append', default=[], metavar='NAME',
+                    help='视为未定义的宏，隐含 --prune（可多次指定）')
+    ap.add_argument('--no-gitignore', action='store_true',
+                    help='不读取 .gitignore / .git/info/exclude')
+    ap.add_argument('--git', action='store_true',
+                    help='用 git ls-files 列出未被忽略的文件 (不在仓库中时退回 .gitignore 匹配)')
+    ap.add_argument('--profile', action='store_true',
+                    help='按阶段 / 文件类型统计耗时、调用次数与字节数，输出到 stderr (强制 -j 1)')
+    ap.add_argument('--profile-top', type=int, default=10,
+                    help='--profile 报告中列出的最慢文件数')
+    ap.add_argument('--profile-dump', default=None,
+                    help='同时把 cProfile 结果写入此文件 (隐含 --profile)')
     args = ap.parse_args()
-    main(args.dir, args.o)
+
+    cache = False if args.no_cache else (args.cache_dir or True)
+    index = args.index
+    if index == '':
+        index = os.path.splitext(args.o)[0] + '.idx.json'
+    opts = dict(dedup=args.dedup,
+                stream=args.stream,
+                max_tokens=args.max_tokens,
+                include_dirs=args.include_dir,
+                resolve=args.resolve_includes,
+                closure=args.closure,
+                calls=args.calls,
+                code_level=args.code,
+                expand=args.expand,
+                index=index,
+                max_size=args.max_file_size,
+                built_only=args.built_only,
+                prune=bool(args.prune or args.define or args.undef),
+                defines={**{d.partition('=')[0]: d.partition('=')[2] or '1' for d in args.define},
+                         **dict.fromkeys(args.undef)},
+                gitignore=not args.no_gitignore,
+                git=args.git)
+    if args.batch and args.watch:
+        ap.error('--batch 不能与 --watch 同时使用')
+    if args.batch:
+        jobs = args.jobs or os.cpu_count() or 1
+        t0 = time.perf_counter()
+        prof = Profiler(dump=args.profile_dump) if args.profile or args.profile_dump else NOPROF
+        names = batch(args.dir, args.batch, args.out_dir, cache=cache,
+                      jobs=1 if prof.enabled else jobs, prof=prof, **opts)
+        prof.report(args.profile_top)
+        print(f'{len(names)} 个模块 -> {args.out_dir} ({(time.perf_counter() - t0) * 1000:.0f} ms)',
+              file=sys.stderr)
+    elif args.watch:
+        watch(args.dir, args.o, cache=cache, interval=args.interval, **opts)
+    elif args.profile or args.profile_dump:
+        # 分阶段计时只统计当前进程，分析不分发到进程池
+        prof = Profiler(dump=args.profile_dump)
+        main(args.dir, args.o, cache=cache, jobs=1, prof=prof, **opts)
+        prof.report(args.profile_top)
+    else:
+        main(args.dir, args.o, cache=cache, jobs=args.jobs or os.cpu_count() or 1, **opts)
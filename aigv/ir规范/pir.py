@@ -0,0 +1,76 @@
+import sys, json, argparse
+
+import pirio
+import pirdiff
+from symindex import load_index, query
+
+# ===== PIR 工具入口 =====
+# python pir.py query <symbol> [-i pir.idx.json]
+# python pir.py diff A B [-o delta.pir]
+
+def cmd_query(args):
+    idx = load_index(args.index)
+    units = idx['units']
+    rc = 0
+    for name in args.symbol:
+        res = query(idx, name)
+        if res is None:
+            print(f'{name}: 未找到', file=sys.stderr)
+            rc = 1
+            continue
+        if args.json:
+            print(json.dumps({'symbol': name, **res}, ensure_ascii=False))
+            continue
+
+        print(name)
+        for u, role, decl, start, end in res['defs']:
+            span = '' if start is None else f':{start}' if start == end else f':{start}-{end}'
+            print(f'  {decl or "def":<6}{u:<6}{units[u]}{span} {role}')
+        for u, path in res['refs']:
+            via = ''
+            if path:
+                via = '  via ' + ' -> '.join(units[v] for v in path)
+            print(f'  {"ref":<6}{u:<6}{units[u]}{via}')
+    return rc
+
+def cmd_diff(args):
+    try:
+        a = pirdiff.load(args.a, args.os_args)
+        b = pirdiff.load(args.b, args.os_args)
+    except (OSError, ValueError) as e:
+        print(f'pir diff: {e}', file=sys.stderr)
+        return 2
+    delta, stat = pirdiff.diff(a, b)
+
+    if args.o:
+        pirio.save(delta, args.o)
+    else:
+        pirio.write_text(delta, sys.stdout)
+    add, rm, ch = stat.pop('UNITS')
+    parts = [f'units +{add} -{rm} ~{ch}']
+    parts += [f'{k.lower()} +{p} -{m}' for k, (p, m) in stat.items() if p or m]
+    print(', '.join(parts), file=sys.stderr)
+    return 1 if len(delta) > 1 else 0
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(prog='pir')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+
+    q = sub.add_parser('query', help='查询符号的定义、引用单元与 include 路径')
+    q.add_argument('symbol', nargs='+')
+    q.add_argument('-i', '--index', default='pir.idx.json',
+                   help='ir规范/os.py --index 生成的索引文件')
+    q.add_argument('--json', action='store_true', help='每个符号输出一行 JSON')
+    q.set_defaults(func=cmd_query)
+
+    d = sub.add_parser('diff', help='输出 B 相对 A 的增量 PIR（只含变化的单元、符号、依赖边与布局）')
+    d.add_argument('a', help='基准：PIR 文件、源码目录，或 REV:路径（git 版本中的 PIR 文件或源码目录）')
+    d.add_argument('b', help='目标，形式同上')
+    d.add_argument('-o', default=None, help='输出文件，以 .pirb 结尾写二进制 (默认: 标准输出)')
+    d.add_argument('--os-args', default='',
+                   help='A/B 为目录时传给 os.py 的额外参数，如 --os-args="--resolve-includes"；'
+                        '默认附加 --no-cache，不在被比较的树中写缓存')
+    d.set_defaults(func=cmd_diff)
+
+    args = ap.parse_args()
+    sys.exit(args.func(args))
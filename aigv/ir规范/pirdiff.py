@@ -0,0 +1,216 @@
+import io, os, sys, shlex, shutil, hashlib, tarfile, tempfile, subprocess
+
+import pirio
+
+# ===== PIR 增量 =====
+# 比较两份 PIR（基准 A 与目标 B），输出只含变化部分的增量 PIR，供 pir.py diff 使用。
+# 两边的 uX 编号各自独立，比较前一律按路径对齐；代码正文比较 sha256。
+# 增量 PIR 的各区块含义与完整 PIR 相同，只是只列出新增 / 变化的行，编号用 B 的：
+#   META     base:<A 的摘要>，以及取值有变化的字段
+#   UNITS    新增、属性或编号有变化、以及增量中其他区块引用到的单元
+#   GRAPH / SYMBOLS / CALLS / DEPS    新增或变化的行
+#   LAYOUT   有任何变化时整体给出（顺序即布局顺序，逐行增删无法表达位置）
+#   CODE     新增单元与正文哈希变化的单元
+#   REMOVED  删除的行，写作 '区块名:原行'；整个单元被删时只写 'UNITS:路径'，其余行随之删除
+
+def digest(pir):
+    """PIR 内容摘要：按文本格式写出后的 sha256 前 16 位，与编码无关"""
+    buf = io.StringIO()
+    pirio.write_text(pir, buf)
+    return hashlib.sha256(buf.getvalue().encode('utf-8')).hexdigest()[:16]
+
+def _bodies(pir):
+    """uX -> 正文；dedup 引用行展开为被引用单元的正文"""
+    rows = pir.get('CODE', [])
+    body = {u: b for u, b, ref in rows if ref == u}
+    return {u: body.get(ref, '') for u, _, ref in rows}
+
+def _side(pir):
+    units = pir.get('UNITS', [])
+    path = {u: p for u, p, _ in units}
+
+    def target(t):
+        # --resolve-includes 时目标是 uX，换成路径才能跨两边比较
+        return ('u', path[t]) if t in path else ('f', t)
+
+    def ulist(s):
+        return frozenset(path.get(u, u) for u in s.split(',') if u)
+
+    code = {path.get(u, u): hashlib.sha256(b.encode('utf-8')).digest()
+            for u, b in _bodies(pir).items()}
+    return {
+        'meta': dict(pir.get('META', [])),
+        'units': {p: (u, attrs) for u, p, attrs in units},
+        'code': code,
+        'graph': [(path.get(s, s), k, target(t)) for s, k, t in pir.get('GRAPH', [])],
+        'symbols': [(n, path.get(u, u), r) for n, u, r in pir.get('SYMBOLS', [])],
+        'calls': [(c, path.get(u, u), e) for c, u, e in pir.get('CALLS', [])],
+        'deps': {path.get(u, u): (ulist(d), ulist(r)) for u, d, r in pir.get('DEPS', [])},
+        'layout': pir.get('LAYOUT', []),
+    }
+
+def diff(a, b):
+    """返回 (增量 PIR, 统计)；a、b 为 pirio 内存模型"""
+    A, B = _side(a), _side(b)
+    bid = {p: u for p, (u, _) in B['units'].items()}
+    used = set()  # 增量中引用到的 B 单元
+    stat = {}
+
+    def uid(p):
+        used.add(p)
+        return bid[p]
+
+    delta = {}
+    removed = []
+
+    meta = [('base', digest(a))]
+    for k, v in B['meta'].items():
+        if A['meta'].get(k) != v:
+            meta.append((k, v))
+    removed += [('META:' + k,) for k in A['meta'] if k not in B['meta']]
+    delta['META'] = meta
+
+    gone = [p for p in A['units'] if p not in B['units']]
+    added = [p for p in B['units'] if p not in A['units']]
+    changed = [p for p in B['units'] if p in A['units'] and A['units'][p] != B['units'][p]]
+    used.update(added, changed)
+    removed += [('UNITS:' + p,) for p in gone]
+
+    # 集合差分：行内单元换成 B 的编号；所属单元已整体删除的行不必再列
+    def rows(name, old, new, fmt, owner=0):
+        seen_old, seen_new = set(old), set(new)
+        plus = [fmt(r) for r in dict.fromkeys(new) if r not in seen_old]
+        minus = [fmt(r) for r in dict.fromkeys(old) if r not in seen_new and r[owner] in bid]
+        stat[name] = (len(plus), len(minus))
+        if plus:
+            delta[name] = plus
+        removed.extend((f'{name}:{pirio._line(name, r)}',) for r in minus)
+
+    def edge(r):
+        s, k, (kind, t) = r
+        return (uid(s), k, uid(t) if kind == 'u' and t in bid else t)
+
+    def dep(pair):
+        return tuple(','.join(uid(q) for q in sorted(s, key=lambda q: int(bid[q][1:])) if q in bid)
+                     for s in pair)
+
+    rows('GRAPH', A['graph'], B['graph'], edge)
+    if 'DEPS' in b:
+        plus = [(uid(p), *dep(v)) for p, v in B['deps'].items() if A['deps'].get(p) != v]
+        minus = [(uid(p), '', '') for p in A['deps'] if p in bid and p not in B['deps']]
+        stat['DEPS'] = (len(plus), len(minus))
+        if plus:
+            delta['DEPS'] = plus
+        removed.extend(('DEPS:' + u,) for u, _, _ in minus)
+    rows('SYMBOLS', A['symbols'], B['symbols'], lambda r: (r[0], uid(r[1]), r[2]), owner=1)
+    rows('CALLS', A['calls'], B['calls'], lambda r: (r[0], uid(r[1]), r[2]), owner=1)
+
+    if A['layout'] != B['layout']:
+        delta['LAYOUT'] = B['layout']
+        stat['LAYOUT'] = (len(B['layout']), 0)
+
+    # 增量内部同样去重：正文相同的单元写作 uX=uY，uY 一定在本增量中
+    code, first, bodies = [], {}, _bodies(b)
+    for p, h in B['code'].items():
+        if A['code'].get(p) == h:
+            continue
+        u = uid(p)
+        ref = first.setdefault(h, u)
+        code.append((u, bodies[u] if ref == u else '', ref))
+    minus = [p for p in A['code'] if p in bid and p not in B['code']]
+    removed.extend(('CODE:' + uid(p),) for p in minus)
+    stat['CODE'] = (len(code), len(minus))
+
+    units = [(u, p, attrs) for u, p, attrs in b.get('UNITS', []) if p in used]
+    stat['UNITS'] = (len(added), len(gone), len(changed))
+    if units:
+        delta = {'META': delta.pop('META'), 'UNITS': units, **delta}
+    if code:
+        delta['CODE'] = code
+    if removed:
+        delta['REMOVED'] = removed
+    return delta, stat
+
+# ===== 输入 =====
+# A / B 可以是 PIR 文件（文本或 .pirb）、git 版本中的对象（REV:路径），或者源码目录。
+# 目录调用同目录的 os.py 现场生成（默认 --no-cache，不在被比较的树里留下 .pir-cache），
+# os_args 为额外的 os.py 参数。REV:路径 指向 PIR 文件时直接解析；指向目录时用 git archive
+# 把整个版本导出到临时目录再对其中的该目录运行 os.py —— 目录外的 .gitignore、
+# Makefile include 的 ../common.mk 等与工作区运行时一样可见。
+
+def _parse(data, spec):
+    if data[:4] == pirio.MAGIC:
+        return pirio.read_bin(io.BytesIO(data))
+    try:
+        return pirio.read_text(io.StringIO(data.decode('utf-8')))
+    except UnicodeDecodeError as e:
+        raise ValueError(f'{spec}: 不是 UTF-8 文本: {e}') from None
+
+def _git(*args, data=False):
+    out = subprocess.run(['git', *args], capture_output=True)
+    if out.returncode:
+        msg = out.stderr.decode('utf-8', 'ignore').strip().splitlines()
+        raise ValueError(msg[-1] if msg else f'git {args[0]} 失败')
+    return out.stdout if data else out.stdout.decode('utf-8').strip()
+
+def _run_os(root, os_args):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'os.py')
+    args = shlex.split(os_args)
+    if '--no-cache' not in args and not any(a.startswith('--cache-dir') for a in args):
+        args.append('--no-cache')
+    fd, tmp = tempfile.mkstemp(suffix='.pir')
+    os.close(fd)
+    try:
+        proc = subprocess.run([sys.executable, script, root, '-o', tmp, *args],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        sys.stderr.write(proc.stderr if not proc.returncode else '')
+        if proc.returncode:
+            lines = proc.stderr.strip().splitlines()
+            raise ValueError(f'os.py 分析 {root} 失败: {lines[-1] if lines else proc.returncode}')
+        return pirio.load(tmp)
+    finally:
+        os.unlink(tmp)
+
+def _load_rev_tree(rev, path, os_args):
+    top = _git('rev-parse', '--show-toplevel')
+    if path.startswith(('./', '../')) or path in ('.', '..'):
+        path = os.path.join(_git('rev-parse', '--show-prefix'), path)
+    path = os.path.normpath(path).replace(os.sep, '/')
+    path = '' if path == '.' else path
+    tmp = tempfile.mkdtemp(prefix='pir-diff-')
+    try:
+        # 以仓库目录名为导出目录名：os.py 用目录名作模块名
+        root = os.path.join(tmp, os.path.basename(top))
+        os.makedirs(os.path.join(root, '.git'))  # 让 walker 把这里当作仓库顶层
+        with tarfile.open(fileobj=io.BytesIO(_git('-C', top, 'archive', '--format=tar', rev,
+                                                  data=True))) as tar:
+            if hasattr(tarfile, 'data_filter'):
+                tar.extractall(root, filter='data')
+            else:
+                tar.extractall(root)
+        pir = _run_os(os.path.join(root, path) if path else root, os_args)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # META 中的 root 换回工作区中的对应路径，与直接对目录运行的结果可比
+    real = os.path.join(top, path) if path else top
+    pir['META'] = [(k, real if k == 'root' else v) for k, v in pir.get('META', [])]
+    return pir
+
+def _load(spec, os_args):
+    if os.path.isdir(spec):
+        return _run_os(spec, os_args)
+    if not os.path.exists(spec) and ':' in spec:
+        rev, _, path = spec.partition(':')
+        kind = _git('cat-file', '-t', spec)
+        if kind == 'tree':
+            return _load_rev_tree(rev, path, os_args)
+        if kind != 'blob':
+            raise ValueError(f'{spec}: 不是文件或目录 ({kind})')
+        return _parse(_git('cat-file', 'blob', spec, data=True), spec)
+    return pirio.load(spec)
+
+def load(spec, os_args=''):
+    pir = _load(spec, os_args)
+    if 'META' not in pir:
+        raise ValueError(f'{spec}: 不是 PIR（缺少 <META> 区块）')
+    return pir
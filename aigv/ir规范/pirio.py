@@ -0,0 +1,275 @@
+import re, sys, time, struct
+from array import array
+from operator import itemgetter
+
+# ===== PIR 读写 =====
+# 内存模型：{区块名: [行, ...]}，dict 顺序即区块顺序。
+# 每个区块的行都是定长字符串元组：
+#   META    (key, value)
+#   UNITS   (u, path, attrs)          attrs 原样保留，如 'type=C arch=core'
+#   GRAPH   (src, kind, target)
+#   DEPS    (u, deps, rdeps)          逗号分隔的 uX 列表
+#   SYMBOLS (name, u, role)
+#   CALLS   (caller, u, callee)
+#   LAYOUT  (key, sep, value)         ENTRY=_start -> ('ENTRY', '=', '_start')
+#   CODE    (u, body, ref)            正文块 ref == u；引用行 uX=uY 的 body 为 ''
+#   其他    (line,)                   未识别的扩展区块按行保留
+
+_TAG = re.compile(r'<(/?)([A-Z][A-Z0-9_]*)>$')
+_UNIT = re.compile(r'(u\d+):(.*?)((?: \w+=\S*)*)$')
+_EDGE = re.compile(r'(\S+?)->(\w+):(.*)$')
+_SYMBOL = re.compile(r'(.+):(u\d+) (\S+)$')
+_CALL = re.compile(r'(.+):(u\d+)->(.+)$')
+_DEPS = re.compile(r'(u\d+) deps=(\S*) rdeps=(\S*)$')
+_REF = re.compile(r'(u\d+)=(u\d+)$')
+_OPEN = re.compile(r'<(u\d+)>$')
+
+def _row(block, line):
+    """行文本 -> 行元组；格式不符时返回 None"""
+    if block == 'META':
+        k, sep, v = line.partition(':')
+        return (k, v) if k and sep else None
+    if block == 'UNITS':
+        m = _UNIT.match(line)
+        return m and (m.group(1), m.group(2), m.group(3)[1:])
+    if block == 'LAYOUT':
+        sep = ':' if line.startswith('.') else '='
+        k, found, v = line.partition(sep)
+        return (k, sep, v) if k and found else None
+    if block == 'CODE':
+        return None  # 正文块与引用行已在 iter_text 中处理
+    rx = {'GRAPH': _EDGE, 'SYMBOLS': _SYMBOL, 'CALLS': _CALL, 'DEPS': _DEPS}.get(block)
+    if rx is None:
+        return (line,)
+    m = rx.match(line)
+    return m and m.groups()
+
+def iter_text(lines):
+    """
+    流式解析：逐行读取，产出 (区块名, 行元组)；区块开始时产出 (区块名, None)。
+    区块外的内容、格式不符的行、不配对的标签均抛出 ValueError('line N: ...')
+    """
+    block = None
+    body = None  # CODE 中正在收集的 (u, [lines], 起始行号)
+    n = 0
+    for n, line in enumerate(lines, 1):
+        line = line.rstrip('\n')
+        if body is not None:
+            if line == f'</{body[0]}>':
+                yield 'CODE', (body[0], '\n'.join(body[1]), body[0])
+                body = None
+            else:
+                body[1].append(line)
+            continue
+        if not line:
+            continue
+        m = _TAG.match(line)
+        if m:
+            closing, name = m.groups()
+            if name == 'PIR':
+                if block is not None:
+                    raise ValueError(f'line {n}: <{block}> 未闭合')
+            elif closing:
+                if name != block:
+                    raise ValueError(f'line {n}: </{name}> 与 <{block}> 不配对')
+                block = None
+            else:
+                if block is not None:
+                    raise ValueError(f'line {n}: <{block}> 未闭合')
+                block = name
+                yield block, None
+            continue
+        if block is None:
+            raise ValueError(f'line {n}: 区块之外的内容: {line[:60]!r}')
+        if block == 'CODE':
+            m = _OPEN.match(line)
+            if m:
+                body = (m.group(1), [], n)
+                continue
+            m = _REF.match(line)
+            if m:
+                yield 'CODE', (m.group(1), '', m.group(2))
+                continue
+        row = _row(block, line)
+        if row is None:
+            raise ValueError(f'line {n}: {block} 行格式不符: {line[:60]!r}')
+        yield block, row
+    if body is not None:
+        raise ValueError(f'line {body[2]}: <{body[0]}> 正文未闭合')
+    if block is not None:
+        raise ValueError(f'line {n}: <{block}> 未闭合')
+
+def read_text(fp):
+    pir = {}
+    for block, row in iter_text(fp):
+        rows = pir.setdefault(block, [])
+        if row is not None:
+            rows.append(row)
+    return pir
+
+def _line(block, row):
+    if block == 'META':
+        return f'{row[0]}:{row[1]}'
+    if block == 'UNITS':
+        return f'{row[0]}:{row[1]} {row[2]}' if row[2] else f'{row[0]}:{row[1]}'
+    if block == 'GRAPH':
+        return f'{row[0]}->{row[1]}:{row[2]}'
+    if block == 'SYMBOLS':
+        return f'{row[0]}:{row[1]} {row[2]}'
+    if block == 'CALLS':
+        return f'{row[0]}:{row[1]}->{row[2]}'
+    if block == 'DEPS':
+        return f'{row[0]} deps={row[1]} rdeps={row[2]}'
+    if block == 'LAYOUT':
+        return ''.join(row)
+    if block == 'CODE':
+        u, body, ref = row
+        return f'{u}={ref}' if ref != u else f'<{u}>\n{body}\n</{u}>'
+    return row[0]
+
+def write_text(pir, fp):
+    """写出与 ir规范/os.py 相同排版的文本 PIR：区块之间空一行，最后一个区块后不空行"""
+    fp.write('<PIR>\n')
+    names = list(pir)
+    for i, block in enumerate(names):
+        fp.write(f'<{block}>\n')
+        for row in pir[block]:
+            fp.write(_line(block, row) + '\n')
+        fp.write(f'</{block}>\n')
+        if i != len(names) - 1:
+            fp.write('\n')
+    fp.write('</PIR>\n')
+
+# ===== 二进制编码 =====
+# 'PIRB' | u8 版本 | u32 字符串数 | u32 字节数 | 字符串表 (UTF-8，'\0' 分隔)
+# | u32 区块数 | 每个区块: u16 名称长度, 名称, u8 列数, u32 行数, 各列 u32 字符串 id 数组
+# 路径、符号名等重复字符串只在表中出现一次；加载时整表一次 split，
+# 各列用 itemgetter 批量取值，基本不经过 Python 层逐行解析。
+
+MAGIC = b'PIRB'
+VERSION = 1
+
+def write_bin(pir, fp):
+    table, index = [], {}
+
+    def intern(s):
+        i = index.get(s)
+        if i is None:
+            if '\0' in s:
+                raise ValueError('PIR 字符串中含有 NUL，无法编码')
+            i = index[s] = len(table)
+            table.append(s)
+        return i
+
+    blocks = []
+    for block, rows in pir.items():
+        arity = len(rows[0]) if rows else 0
+        cols = [array('I', (intern(r[c]) for r in rows)) for c in range(arity)]
+        blocks.append((block, arity, len(rows), cols))
+
+    blob = '\0'.join(table).encode('utf-8')
+    fp.write(MAGIC + struct.pack('<BII', VERSION, len(table), len(blob)))
+    fp.write(blob)
+    fp.write(struct.pack('<I', len(blocks)))
+    for block, arity, n, cols in blocks:
+        name = block.encode('utf-8')
+        fp.write(struct.pack('<H', len(name)) + name + struct.pack('<BI', arity, n))
+        for col in cols:
+            if sys.byteorder == 'big':
+                col.byteswap()
+            fp.write(col.tobytes())
+
+def read_bin(fp):
+    data = fp.read()
+    if data[:4] != MAGIC:
+        raise ValueError('不是二进制 PIR 文件')
+    try:
+        return _decode_bin(data)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f'二进制 PIR 已损坏: {e}') from None
+
+def _decode_bin(data):
+    version, nstr, size = struct.unpack_from('<BII', data, 4)
+    if version != VERSION:
+        raise ValueError(f'不支持的二进制 PIR 版本: {version}')
+    pos = 4 + 9
+    table = data[pos:pos + size].decode('utf-8').split('\0') if nstr else []
+    pos += size
+
+    pir = {}
+    (nblocks,) = struct.unpack_from('<I', data, pos)
+    pos += 4
+    for _ in range(nblocks):
+        (nlen,) = struct.unpack_from('<H', data, pos)
+        pos += 2
+        block = data[pos:pos + nlen].decode('utf-8')
+        pos += nlen
+        arity, n = struct.unpack_from('<BI', data, pos)
+        pos += 5
+        cols = []
+        for _ in range(arity):
+            ids = array('I')
+            ids.frombytes(data[pos:pos + 4 * n])
+            if len(ids) != n:
+                raise IndexError('列数据不完整')
+            if sys.byteorder == 'big':
+                ids.byteswap()
+            pos += 4 * n
+            if n == 1:
+                cols.append((table[ids[0]],))
+            else:
+                cols.append(itemgetter(*ids)(table) if n else ())
+        pir[block] = list(zip(*cols))
+    return pir
+
+def load(path):
+    """按文件头自动识别文本 / 二进制 PIR"""
+    with open(path, 'rb') as fd:
+        if fd.read(4) == MAGIC:
+            fd.seek(0)
+            return read_bin(fd)
+    with open(path, 'r', encoding='utf-8') as fd:
+        return read_text(fd)
+
+def save(pir, path):
+    if path.endswith('.pirb'):
+        with open(path, 'wb') as fd:
+            write_bin(pir, fd)
+    else:
+        with open(path, 'w', encoding='utf-8') as fd:
+            write_text(pir, fd)
+
+# ===== 基准 =====
+
+def bench(path, rounds=5):
+    import io
+    with open(path, 'r', encoding='utf-8') as fd:
+        text = fd.read()
+    pir = read_text(io.StringIO(text))
+    buf = io.BytesIO()
+    write_bin(pir, buf)
+    raw = buf.getvalue()
+
+    def run(fn):
+        best = None
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            fn()
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        return best
+
+    t_text = run(lambda: read_text(io.StringIO(text)))
+    t_bin = run(lambda: read_bin(io.BytesIO(raw)))
+    print(f'text  : {len(text.encode()):>10} bytes  {t_text * 1000:8.2f} ms')
+    print(f'binary: {len(raw):>10} bytes  {t_bin * 1000:8.2f} ms  ({t_text / t_bin:.1f}x)')
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--bench':
+        bench(sys.argv[2])
+    elif len(sys.argv) == 3:
+        # 格式转换：目标以 .pirb 结尾写二进制，否则写文本
+        save(load(sys.argv[1]), sys.argv[2])
+    else:
+        print('usage: pirio.py IN OUT | pirio.py --bench IN.pir')
+        sys.exit(1)
@@ -0,0 +1,252 @@
+import re, sys
+
+# ===== 条件编译裁剪 =====
+# 在符号提取与压缩之前去掉 #if/#ifdef/#ifndef/#elif/#else 中不生效的分支。
+# defines: {宏名: 值}，值为 None 表示已知未定义（例如 Makefile 中出现过但本配置未打开的 -D）。
+# 求值是三值的：不在 defines 中、本文件也没有 #define/#undef 过的宏视为未知，
+# 依赖未知宏的条件整体原样保留（头文件保护、外部头文件中的宏等），只裁剪能确定的分支。
+# 被裁掉的行（连同已确定的指令行）替换为空行，行号保持不变。
+
+_DIRECTIVE = re.compile(r'[ \t]*#[ \t]*(\w+)(.*)$', re.S)
+_HAS_COND = re.compile(r'^[ \t]*#[ \t]*if', re.M)
+_EXPR_TOK = re.compile(r'\s*(?:(0[xX][0-9a-fA-F]+|\d+)[uUlL]*|([A-Za-z_]\w*)|(&&|\|\||<<|>>|<=|>=|==|!=|[-+*/%<>&|^!~?:()]))')
+_COMMENT = re.compile(r'/\*.*?\*/|//.*$')
+
+UNKNOWN = object()  # 本文件中在未确定分支里 #define/#undef 过的宏
+
+class _Expr:
+    """#if 表达式的递归下降求值；结果为 int，无法确定时为 None"""
+
+    def __init__(self, text, lookup):
+        self.toks = []
+        text = _COMMENT.sub(' ', text).strip()
+        pos = 0
+        while pos < len(text):
+            m = _EXPR_TOK.match(text, pos)
+            if not m or m.end() == pos:
+                raise ValueError(text)
+            num, ident, op = m.groups()
+            if num:
+                base = 16 if num[:2] in ('0x', '0X') else 8 if num[0] == '0' else 10
+                self.toks.append(('n', int(num, base)))
+            else:
+                self.toks.append(('i', ident) if ident else ('o', op))
+            pos = m.end()
+        self.i = 0
+        self.lookup = lookup
+
+    def peek(self):
+        return self.toks[self.i] if self.i < len(self.toks) else (None, None)
+
+    def take(self, op=None):
+        t = self.peek()
+        if op is not None and t != ('o', op):
+            raise ValueError(op)
+        self.i += 1
+        return t
+
+    def parse(self):
+        v = self.cond()
+        if self.i != len(self.toks):
+            raise ValueError('trailing tokens')
+        return v
+
+    def cond(self):
+        c = self.binary(0)
+        if self.peek() == ('o', '?'):
+            self.take()
+            a = self.cond()
+            self.take(':')
+            b = self.cond()
+            if c is None:
+                return a if a == b else None
+            return a if c else b
+        return c
+
+    _PREC = [('||',), ('&&',), ('|',), ('^',), ('&',), ('==', '!='), ('<', '>', '<=', '>='),
+             ('<<', '>>'), ('+', '-'), ('*', '/', '%')]
+
+    def binary(self, level):
+        if level == len(self._PREC):
+            return self.unary()
+        left = self.binary(level + 1)
+        while self.peek()[0] == 'o' and self.peek()[1] in self._PREC[level]:
+            op = self.take()[1]
+            right = self.binary(level + 1)
+            left = self.apply(op, left, right)
+        return left
+
+    @staticmethod
+    def apply(op, a, b):
+        # 逻辑运算可以在一侧未知时确定结果
+        if op == '&&':
+            return 0 if a == 0 or b == 0 else None if a is None or b is None else 1
+        if op == '||':
+            return 1 if (a is not None and a) or (b is not None and b) else None if a is None or b is None else 0
+        if a is None or b is None:
+            return None
+        if op in ('/', '%') and b == 0:
+            return None
+        return int({
+            '|': lambda: a | b, '^': lambda: a ^ b, '&': lambda: a & b,
+            '==': lambda: a == b, '!=': lambda: a != b, '<': lambda: a < b, '>': lambda: a > b,
+            '<=': lambda: a <= b, '>=': lambda: a >= b, '<<': lambda: a << b, '>>': lambda: a >> b,
+            '+': lambda: a + b, '-': lambda: a - b, '*': lambda: a * b,
+            '/': lambda: int(a / b), '%': lambda: a - b * int(a / b),
+        }[op]())
+
+    def unary(self):
+        kind, t = self.take()
+        if kind == 'n':
+            return t
+        if kind == 'o':
+            if t == '(':
+                v = self.cond()
+                self.take(')')
+                return v
+            v = self.unary()
+            if v is None:
+                return None
+            return {'!': lambda: int(not v), '~': lambda: ~v, '-': lambda: -v, '+': lambda: v}[t]()
+        if kind == 'i':
+            if t == 'defined':
+                paren = self.peek() == ('o', '(')
+                if paren:
+                    self.take()
+                name = self.take()[1]
+                if paren:
+                    self.take(')')
+                d = self.lookup(name)
+                return None if d is UNKNOWN else int(d is not None)
+            d = self.lookup(t)
+            if d is UNKNOWN:
+                return None
+            if d is None:
+                return 0  # 未定义的标识符在 #if 中为 0
+            try:
+                return int(d.rstrip('uUlL'), 0)
+            except ValueError:
+                return None
+        raise ValueError('unexpected end')
+
+def evaluate(expr, lookup):
+    """lookup(name) 返回宏值字符串 / None（未定义）/ UNKNOWN；表达式无法解析时视为未知"""
+    try:
+        return _Expr(expr, lookup).parse()
+    except (ValueError, IndexError, TypeError):
+        return None
+
+def _logical_lines(text):
+    """按 '\\' 续行合并为逻辑行，产出 (逻辑行, 物理行数)"""
+    lines = text.split('\n')
+    i = 0
+    while i < len(lines):
+        j = i
+        while lines[j].endswith('\\') and j + 1 < len(lines):
+            j += 1
+        yield '\n'.join(lines[i:j + 1]), j - i + 1
+        i = j + 1
+
+def prune(text, defines):
+    """去掉 defines 下不生效的条件分支；没有条件指令或指令不配对时原样返回"""
+    if not _HAS_COND.search(text):
+        return text
+
+    local = {}
+    def lookup(name):
+        if name in local:
+            return local[name]
+        return defines.get(name, UNKNOWN)
+
+    out = []
+    # 每层: [mode, active, taken]
+    #   mode 'cut'  条件已确定：指令行删除，只保留生效分支
+    #   mode 'keep' 条件未知：整体原样保留
+    stack = []
+    changed = False
+    for line, n in _logical_lines(text):
+        live = all(f[1] for f in stack)
+        certain = all(f[0] == 'cut' for f in stack)
+        m = _DIRECTIVE.match(line)
+        d = m.group(1) if m else None
+
+        if d in ('if', 'ifdef', 'ifndef'):
+            arg = m.group(2).replace('\\\n', ' ')
+            if not live:
+                stack.append(['cut', False, True])
+                v = 0
+            elif d == 'if':
+                v = evaluate(arg, lookup)
+            else:
+                name = arg.split()[0] if arg.split() else ''
+                v = lookup(name)
+                v = None if v is UNKNOWN else int((v is not None) == (d == 'ifdef'))
+            if live:
+                if v is None:
+                    stack.append(['keep', True, False])
+                else:
+                    stack.append(['cut', bool(v), bool(v)])
+            keep_line = live and v is None
+        elif d in ('elif', 'else') and stack:
+            f = stack[-1]
+            parent = all(x[1] for x in stack[:-1])
+            keep_line = False
+            if f[0] == 'keep':
+                keep_line = True
+                f[1] = parent
+            elif not parent or f[2]:
+                f[1] = False
+            elif d == 'else':
+                f[1] = f[2] = True
+            else:
+                v = evaluate(m.group(2).replace('\\\n', ' '), lookup)
+                if v is None:
+                    # 之前的分支都不生效，未知的 #elif 等价于一个新的 #if
+                    line = re.sub(r'elif', 'if', line, count=1)
+                    f[0], f[1] = 'keep', True
+                    keep_line = True
+                else:
+                    f[1] = f[2] = bool(v)
+        elif d == 'endif' and stack:
+            keep_line = stack.pop()[0] == 'keep' and all(f[1] for f in stack)
+        elif d in ('elif', 'else', 'endif'):
+            return text  # 不配对
+        else:
+            keep_line = live
+            if live and d in ('define', 'undef'):
+                parts = m.group(2).split(None, 1)
+                if parts:
+                    name = re.match(r'\w*', parts[0]).group()
+                    if not certain:
+                        local[name] = UNKNOWN
+                    elif d == 'undef':
+                        local[name] = None
+                    else:
+                        # 函数式宏只关心是否定义
+                        body = parts[1].strip() if len(parts) > 1 and '(' not in parts[0] else ''
+                        local[name] = body or '1'
+
+        if keep_line:
+            out.append(line)
+        else:
+            out.append('\n' * (n - 1))
+            changed = True
+
+    if stack:
+        return text
+    return '\n'.join(out) if changed else text
+
+if __name__ == '__main__':
+    # python ppcond.py [-DNAME[=VAL]] [-UNAME] file...
+    defines, paths = {}, []
+    for a in sys.argv[1:]:
+        if a.startswith('-D'):
+            k, _, v = a[2:].partition('=')
+            defines[k] = v or '1'
+        elif a.startswith('-U'):
+            defines[a[2:]] = None
+        else:
+            paths.append(a)
+    for p in paths:
+        with open(p, 'r', encoding='utf-8', errors='ignore') as fd:
+            sys.stdout.write(prune(fd.read(), defines))
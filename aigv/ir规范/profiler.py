@@ -0,0 +1,111 @@
+import sys, time, cProfile
+from collections import defaultdict
+
+# ===== 分阶段计时 =====
+# ir规范/os.py 与 d.py ProjectPacker 共用。关闭时 stage()/file() 返回共享的空上下文，
+# 不计时也不分配对象；开启时按阶段、按 (阶段, 文件类型) 累计耗时 / 调用次数 / 字节数，
+# 并记录每个文件的总耗时用于 top-N 报告。可选 cProfile 转储供 pstats / snakeviz 深入分析。
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _Null()
+
+class _Timer:
+    __slots__ = ('prof', 'name', 'ftype', 'nbytes', 't0')
+
+    def __init__(self, prof, name, ftype, nbytes):
+        self.prof, self.name, self.ftype, self.nbytes = prof, name, ftype, nbytes
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.prof.add(self.name, time.perf_counter() - self.t0, self.ftype, self.nbytes)
+        return False
+
+class _FileTimer(_Timer):
+    __slots__ = ()
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        self.prof.files[self.name] = self.prof.files.get(self.name, 0.0) + dt
+        return False
+
+class Profiler:
+    def __init__(self, enabled=True, dump=None):
+        self.enabled = enabled
+        self.dump = dump    # cProfile 输出路径，None 表示不启用
+        self.stages = defaultdict(lambda: [0.0, 0, 0])  # stage -> [秒, 次数, 字节]
+        self.types = defaultdict(lambda: [0.0, 0, 0])   # (stage, 类型) -> [秒, 次数, 字节]
+        self.files = {}     # 路径 -> 秒
+        self.wall = 0.0
+        self._cprof = None
+        self._t0 = None
+
+    def stage(self, name, ftype=None, nbytes=0):
+        if not self.enabled:
+            return _NULL
+        return _Timer(self, name, ftype, nbytes)
+
+    def file(self, path):
+        if not self.enabled:
+            return _NULL
+        return _FileTimer(self, path, None, 0)
+
+    def add(self, name, dt, ftype=None, nbytes=0):
+        recs = [self.stages[name]]
+        if ftype is not None:
+            recs.append(self.types[name, ftype])
+        for rec in recs:
+            rec[0] += dt
+            rec[1] += 1
+            rec[2] += nbytes
+
+    # 整个运行期间的总耗时与 cProfile
+    def __enter__(self):
+        if self.enabled:
+            if self.dump:
+                self._cprof = cProfile.Profile()
+                self._cprof.enable()
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            self.wall += time.perf_counter() - self._t0
+            if self._cprof:
+                self._cprof.disable()
+                self._cprof.dump_stats(self.dump)
+                self._cprof = None
+        return False
+
+    def report(self, top=10, fp=None):
+        if not self.enabled:
+            return
+        fp = fp or sys.stderr
+        wall = self.wall or sum(t for t, _, _ in self.stages.values()) or 1e-9
+        w = fp.write
+        w(f'== profile: {wall * 1000:.1f} ms ==\n')
+        w(f"{'stage':<16}{'calls':>8}{'bytes':>12}{'ms':>10}{'%':>7}\n")
+        for name, (t, n, b) in sorted(self.stages.items(), key=lambda kv: -kv[1][0]):
+            w(f'{name:<16}{n:>8}{b:>12}{t * 1000:>10.2f}{t / wall * 100:>6.1f}%\n')
+
+        if self.types:
+            w(f"\n{'stage':<16}{'type':<10}{'calls':>8}{'bytes':>12}{'ms':>10}\n")
+            for (name, ftype), (t, n, b) in sorted(self.types.items(), key=lambda kv: -kv[1][0]):
+                w(f'{name:<16}{ftype or "-":<10}{n:>8}{b:>12}{t * 1000:>10.2f}\n')
+
+        if self.files and top:
+            w(f'\ntop {min(top, len(self.files))} slowest files:\n')
+            for path, t in sorted(self.files.items(), key=lambda kv: -kv[1])[:top]:
+                w(f'{t * 1000:>10.2f} ms  {path}\n')
+        if self.dump:
+            w(f'\ncProfile: {self.dump}\n')
+
+NOPROF = Profiler(enabled=False)
@@ -0,0 +1,197 @@
+import os, json, sqlite3
+
+# ===== 分析结果存储 =====
+# 取代 .pir-cache/v1/<kind>/<sha256>.json 的逐文件 JSON：整个缓存目录只有一个 SQLite 文件。
+#   units    路径 -> (mtime_ns, size, sha256, 读前检查结果)：stat 未变的文件不必重新打开、读取、哈希
+#   entries  (sha256, ext, 宏表指纹) -> 单文件分析结果；deps/symbols/calls/layout 为 JSON，code 为压缩后的正文
+# 打开时一次查询载入全部 units；条目按主键逐个查询。写入先排队，
+# 攒够一批或关闭时在一个事务里 upsert。WAL 模式下并发的读不阻塞，
+# 多个进程（如同时运行的批量任务）的写由 busy_timeout 排队。
+
+SCHEMA_VERSION = 2
+BATCH = 512
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS units (
+    path     TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    hash     TEXT NOT NULL,  -- 尚未哈希时为 ''
+    skip     TEXT            -- 文件头检查：'' 文本，'binary' 二进制，NULL 未检查
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    hash    TEXT NOT NULL,
+    ext     TEXT NOT NULL,
+    dkey    TEXT NOT NULL,
+    version TEXT NOT NULL,
+    deps    TEXT NOT NULL,
+    symbols TEXT NOT NULL,
+    calls   TEXT NOT NULL,
+    layout  TEXT,
+    code    TEXT NOT NULL,
+    meta    TEXT NOT NULL,
+    PRIMARY KEY (hash, ext, dkey)
+) WITHOUT ROWID;
+'''
+
+# 条目中单独成列的字段；其余（file/lang/timestamp/unit）合并存入 meta
+_ROW = ('hash', 'version', 'code', 'deps', 'symbols', 'calls', 'layout')
+
+def _json(v):
+    return json.dumps(v, ensure_ascii=False, separators=(',', ':'))
+
+class Store:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            self._migrate()
+        self.stamps = {p: (m, s, h, k) for p, m, s, h, k in
+                       self.db.execute('SELECT path, mtime_ns, size, hash, skip FROM units')}
+        self._stat = {}
+        self._units = []
+        self._entries = []
+
+    def _migrate(self):
+        # 拿到写锁后再读一次版本：同时打开的另一个进程可能已经建好表并写入了数据
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            if self.db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self.db.execute('DROP TABLE IF EXISTS units')
+                self.db.execute('DROP TABLE IF EXISTS entries')
+                for stmt in _SCHEMA.split(';'):
+                    if stmt.strip():
+                        self.db.execute(stmt)
+                self.db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+            self.db.execute('COMMIT')
+        except BaseException:
+            if self.db.in_transaction:
+                self.db.execute('ROLLBACK')
+            raise
+
+    # ----- 文件哈希 -----
+
+    def digest(self, p):
+        """stat 与记录一致时返回记录的 sha256，否则返回 None（需要读文件重新计算）"""
+        p = os.path.abspath(p)
+        try:
+            st = os.stat(p)
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        self._stat[p] = stamp
+        rec = self.stamps.get(p)
+        return (rec[2] or None) if rec and rec[:2] == stamp else None
+
+    def stamp(self, p, digest):
+        p = os.path.abspath(p)
+        stamp = self._stat.pop(p, None)
+        if stamp is None:
+            try:
+                st = os.stat(p)
+            except OSError:
+                return
+            stamp = (st.st_mtime_ns, st.st_size)
+        rec = self.stamps.get(p)
+        self._record(p, (*stamp, digest, rec[3] if rec and rec[:2] == stamp else None))
+
+    # ----- 读前检查 -----
+
+    def verdict(self, p, st):
+        """st 与记录一致时返回记录的文件头检查结果（'' 或 'binary'），否则返回 None"""
+        rec = self.stamps.get(os.path.abspath(p))
+        return rec[3] if rec and rec[:2] == (st.st_mtime_ns, st.st_size) else None
+
+    def sniffed(self, p, st, why):
+        """记录文件头检查结果；只依赖内容，与 max_size 无关的 'size' 不要传进来"""
+        p = os.path.abspath(p)
+        stamp = (st.st_mtime_ns, st.st_size)
+        rec = self.stamps.get(p)
+        self._record(p, (*stamp, rec[2] if rec and rec[:2] == stamp else '', why))
+
+    def _record(self, p, rec):
+        if self.stamps.get(p) != rec:
+            self.stamps[p] = rec
+            self._units.append((p, *rec))
+            self._maybe_flush()
+
+    # ----- 分析结果 -----
+
+    def get(self, digest, ext, dkey, version):
+        row = self.db.execute(
+            'SELECT version, deps, symbols, calls, layout, code, meta FROM entries '
+            'WHERE hash=? AND ext=? AND dkey=?', (digest, ext, dkey)).fetchone()
+        if row is None or row[0] != version:
+            return None
+        ver, deps, symbols, calls, layout, code, meta = row
+        ent = json.loads(meta)
+        ent.update({
+            'hash': digest,
+            'version': ver,
+            'deps': json.loads(deps),
+            'symbols': json.loads(symbols),
+            'calls': json.loads(calls),
+            'layout': json.loads(layout) if layout else None,
+            'code': code,
+        })
+        return ent
+
+    def has(self, digest, ext, dkey, version):
+        """是否有可用的条目；只查版本列，不解码 JSON"""
+        row = self.db.execute('SELECT version FROM entries WHERE hash=? AND ext=? AND dkey=?',
+                              (digest, ext, dkey)).fetchone()
+        return row is not None and row[0] == version
+
+    def put(self, ent, ext, dkey):
+        meta = {k: v for k, v in ent.items() if k not in _ROW}
+        layout = ent['layout']
+        self._entries.append((
+            ent['hash'], ext, dkey, ent['version'],
+            _json(ent['deps']), _json(ent['symbols']), _json(ent['calls']),
+            None if layout is None else _json(layout),
+            ent['code'], _json(meta),
+        ))
+        self._maybe_flush()
+
+    # ----- 批量写入 -----
+
+    def _maybe_flush(self):
+        if len(self._units) + len(self._entries) >= BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self._units and not self._entries:
+            return
+        # 缓存写不进去（只读目录、锁等待超时）不影响本次输出，丢弃这一批即可
+        try:
+            self.db.execute('BEGIN IMMEDIATE')
+            self.db.executemany('INSERT OR REPLACE INTO entries VALUES (?,?,?,?,?,?,?,?,?,?)', self._entries)
+            self.db.executemany('INSERT OR REPLACE INTO units VALUES (?,?,?,?,?)', self._units)
+            self.db.execute('COMMIT')
+        except sqlite3.Error:
+            if self.db.in_transaction:
+                self.db.execute('ROLLBACK')
+        finally:
+            self._units, self._entries = [], []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_store(cache_dir, name='pir.sqlite3'):
+    """cache_dir 下的存储，目录不存在时创建；无法创建或打开时返回 None（相当于不使用缓存）"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        return Store(os.path.join(cache_dir, name))
+    except (OSError, sqlite3.Error):
+        return None
@@ -0,0 +1,107 @@
+import os, re, json
+from collections import Counter, defaultdict, deque
+
+# ===== 符号索引 =====
+# 由 ir规范/os.py 在 build 时顺带生成 (--index)，供 pir.py query 使用。
+# JSON 结构：
+#   units    {uX: 路径}
+#   symbols  {名称: [[uX, 角色, decl, 起始行, 结束行], ...]}   decl 为 def / proto / null
+#   refs     {名称: [[uX, include 路径|null], ...]}
+#            CODE 中使用该名称但未定义它的单元（只有原型声明不算使用），
+#            以及从 uX 经 include 到达任一声明单元的最短路径 [uX, ..., uY]
+#   includes {uX: [uY, ...]}     已解析的 include 边
+# include 路径在生成索引时算好；查询时整份载入，按名称取值为字典查找，不再遍历 include 图。
+
+INDEX_VERSION = 2
+
+_IDENT = re.compile(r'[A-Za-z_.$][\w.$]*')
+
+def idents(code):
+    """压缩后代码中各标识符的出现次数；注释已被移除"""
+    return Counter(_IDENT.findall(code))
+
+def build_index(units, defs, uses, edges):
+    """
+    units: [(u, path), ...]
+    defs:  [(name, u, role, decl, lines), ...]
+    uses:  {u: 该单元 CODE 中的标识符计数}
+    edges: resolve_includes 的结果 [(src_u, inc, dst_u|None), ...]
+    """
+    symbols = defaultdict(list)
+    for name, u, role, decl, lines in defs:
+        start, end = lines if lines else (None, None)
+        rec = [u, role, decl, start, end]
+        if rec not in symbols[name]:
+            symbols[name].append(rec)
+
+    # 单元内原型声明的个数：出现次数超过它才算真正使用
+    protos = Counter()
+    defined = set()
+    for name, recs in symbols.items():
+        for rec in recs:
+            if rec[2] == 'proto':
+                protos[name, rec[0]] += 1
+            else:
+                defined.add((name, rec[0]))
+
+    refs = defaultdict(list)
+    for u, names in uses.items():
+        for name in names.keys() & symbols.keys():
+            if (name, u) not in defined and names[name] > protos[name, u]:
+                refs[name].append(u)
+
+    includes = defaultdict(list)
+    for src, _, dst in edges:
+        if dst and dst != src and dst not in includes[src]:
+            includes[src].append(dst)
+
+    key = lambda u: int(u[1:])
+    paths = {}
+    for name, us in refs.items():
+        decls = {rec[0] for rec in symbols[name]}
+        paths[name] = [[u, include_path(includes, u, decls)] for u in sorted(us, key=key)]
+    return {
+        'version': INDEX_VERSION,
+        'units': dict(units),
+        'symbols': {n: recs for n, recs in sorted(symbols.items())},
+        'refs': {n: paths[n] for n in sorted(paths)},
+        'includes': dict(includes),
+    }
+
+def save_index(idx, path):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fd:
+        json.dump(idx, fd, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+def load_index(path):
+    with open(path, 'r', encoding='utf-8') as fd:
+        idx = json.load(fd)
+    if idx.get('version') != INDEX_VERSION:
+        raise ValueError(f'{path}: 索引版本 {idx.get("version")} 不受支持，请重新生成')
+    return idx
+
+def include_path(includes, src, targets):
+    """src 经 include 到达 targets 中任一单元的最短路径（BFS），不可达返回 None；生成索引时调用"""
+    prev = {src: None}
+    todo = deque([src])
+    while todo:
+        u = todo.popleft()
+        if u in targets and u != src:
+            path = []
+            while u is not None:
+                path.append(u)
+                u = prev[u]
+            return path[::-1]
+        for v in includes.get(u, ()):
+            if v not in prev:
+                prev[v] = u
+                todo.append(v)
+    return None
+
+def query(idx, name):
+    """返回 {'defs': [...], 'refs': [(uX, include 路径|None), ...]}；未知符号返回 None"""
+    recs = idx['symbols'].get(name)
+    if recs is None:
+        return None
+    return {'defs': recs, 'refs': idx['refs'].get(name, [])}
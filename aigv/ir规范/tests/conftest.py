@@ -0,0 +1,25 @@
+import os, sys
+import importlib.util
+
+import pytest
+
+# 与 pir.py 等入口一致：共享模块按脚本目录导入
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+
+@pytest.fixture(scope='session')
+def pir_os():
+    """ir规范/os.py 与标准库 os 同名，按文件路径以别名导入"""
+    spec = importlib.util.spec_from_file_location('pir_os', os.path.join(HERE, 'os.py'))
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod  # -j 的进程池按模块名 pickle analyze_file
+    spec.loader.exec_module(mod)
+    return mod
+
+@pytest.fixture(scope='session')
+def pack_d():
+    """仓库根目录的 d.py（ProjectPacker）"""
+    spec = importlib.util.spec_from_file_location('pack_d', os.path.join(HERE, '..', '..', 'd.py'))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
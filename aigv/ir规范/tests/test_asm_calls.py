@@ -0,0 +1,21 @@
+def test_local_branches_are_not_calls(pir_os):
+    code = ('_start:\n'
+            'csrr t0, mhartid\n'
+            'bnez t0, park\n'
+            'call setup\n'
+            'j start_kernel\n'
+            'park:\n'
+            'wfi\n'
+            'j park\n')
+    assert pir_os.asm_calls(code) == [['_start', 'setup'], ['_start', 'start_kernel']]
+
+def test_call_tail_jal(pir_os):
+    code = ('switch_to:\n'
+            'jal ra, save\n'
+            'jal zero, restore\n'
+            'tail trap_handler\n'
+            'restore:\n'
+            'ret\n'
+            'loop: j loop\n'
+            'self: call self\n')
+    assert pir_os.asm_calls(code) == [['switch_to', 'save'], ['switch_to', 'trap_handler']]
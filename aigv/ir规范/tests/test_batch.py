@@ -0,0 +1,30 @@
+import os, json, sqlite3
+
+SRC = {
+    'm1/start.S': '_start:\ncall main\n',
+    'm1/main.c': 'int main(void) { return helper(); }\nint helper(void) { return 0; }\n',
+    'm2/main.c': 'int main(void) { return 1; }\n',
+    'm2/util.h': '#define ONE 1\nint util(int);\n',
+}
+
+def _modules(cache):
+    db = sqlite3.connect(os.path.join(cache, 'pir.sqlite3'))
+    rows = db.execute('SELECT meta FROM entries').fetchall()
+    db.close()
+    return sorted((json.loads(m)['file'], json.loads(m)['unit']['module']) for m, in rows)
+
+def test_parallel_batch_matches_serial(pir_os, tmp_path):
+    parent = tmp_path / 'src'
+    for rel, text in SRC.items():
+        (parent / rel).parent.mkdir(parents=True, exist_ok=True)
+        (parent / rel).write_text(text)
+
+    outs = {}
+    for jobs in (1, 2):
+        out, cache = tmp_path / f'out{jobs}', str(tmp_path / f'cache{jobs}')
+        pir_os.batch(str(parent), '*', str(out), cache=cache, jobs=jobs)
+        outs[jobs] = {f: (out / f).read_text() for f in sorted(os.listdir(out))}
+        # 并行分析写入存储的条目也记各自的模块，而不是上级目录
+        assert _modules(cache) == [('main.c', 'm1'), ('main.c', 'm2'), ('start.S', 'm1'), ('util.h', 'm2')]
+    assert list(outs[1]) == ['m1.pir', 'm2.pir']
+    assert outs[1] == outs[2]
@@ -0,0 +1,15 @@
+import sys, subprocess
+
+import bench
+
+def test_child_peak_rss_excludes_parent_allocation():
+    # 父进程先占用 200 MB；子进程报告的峰值不应包含这部分
+    big = b'x' * (200 << 20)
+    code = f'import sys; sys.path.insert(0, {bench.HERE!r}); import bench; print(bench.peak_rss_kb())'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert 0 < int(out) < 100 * 1024
+    del big
+
+def test_emitted_files_counts_headers():
+    text = '--- BEGIN FILE: a.c ---\nx\n--- BEGIN FILE: b.c ---\n--- BEGIN FILE: a.c ---\n'
+    assert bench.emitted_files('d', text, '.') == 2
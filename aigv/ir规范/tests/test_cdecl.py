@@ -0,0 +1,53 @@
+from cdecl import scan_decls, parse_funcs
+
+def decls(src):
+    return [(d.kind, d.ret, d.name, d.line) for d in scan_decls(src)]
+
+def test_comma_declarators():
+    assert decls('int a(void), b(int);\n') == [
+        ('proto', 'int', 'a', 1),
+        ('proto', 'int', 'b', 1),
+    ]
+
+def test_comma_declarators_pointer_and_initializer():
+    src = ('unsigned long e = 1, f(char *), *g(void);\n'
+           'int h[3] = {1, 2}, i(void);\n'
+           'static int *j(void), k(int);\n')
+    assert decls(src) == [
+        ('proto', 'unsigned long', 'f', 1),
+        ('proto', 'unsigned long *', 'g', 1),
+        ('proto', 'int', 'i', 2),
+        ('proto', 'static int *', 'j', 3),
+        ('proto', 'static int', 'k', 3),
+    ]
+
+def test_multiline_declaration_line():
+    src = ('/* header */\n'
+           'static int *\n'
+           'c(int x,\n'
+           '  int y)\n'
+           '{\n'
+           '    return d(x);\n'
+           '}\n'
+           'int\n'
+           'e(void);\n')
+    ds = list(scan_decls(src))
+    assert [(d.kind, d.name, d.line, d.end) for d in ds] == [
+        ('def', 'c', 2, 7),
+        ('proto', 'e', 8, 9),
+    ]
+    assert ds[0].calls == ('d',)
+
+def test_calls_and_control_flow_are_not_decls():
+    src = 'void f(void) { if (x) g(); while (y) printf("%d", y); }\n'
+    assert parse_funcs(src) == [('void', 'f')]
+
+def test_asm_with_qualifiers_is_skipped():
+    src = ('__asm__ __volatile__(".globl x\\n");\n'
+           'int after(void);\n'
+           'asm volatile goto("" ::: "memory" : out);\n'
+           'void __attribute__((noreturn)) halt(void) { for (;;) {} }\n')
+    assert decls(src) == [
+        ('proto', 'int', 'after', 2),
+        ('def', 'void', 'halt', 4),
+    ]
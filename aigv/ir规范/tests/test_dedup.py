@@ -0,0 +1,26 @@
+import pirio
+
+SRC = '# x\nadd a0, a0, a1 // y\n'
+
+def test_pir_dedup_keeps_extensions_apart(pir_os, tmp_path):
+    root = tmp_path / 'mod'
+    root.mkdir()
+    for name in ('a.S', 'b.c', 'c.S'):
+        (root / name).write_text(SRC)
+    out = str(tmp_path / 'out.pir')
+    pir_os.main(str(root), out, cache=False, dedup=True)
+    with open(out, encoding='utf-8') as fd:
+        text = fd.read()
+        fd.seek(0)
+        units = {row[1]: row[0] for row in pirio.read_text(fd)['UNITS']}
+    assert f"{units['c.S']}={units['a.S']}" in text
+    assert f"<{units['b.c']}>" in text
+
+def test_packer_dedup_keeps_extensions_apart(pack_d, tmp_path):
+    for name in ('a.py', 'b.c', 'c.py'):
+        (tmp_path / name).write_text('x = 1  # c\n')
+    packer = pack_d.ProjectPacker(str(tmp_path), dedup=True)
+    packer.generate_tree(packer.root_dir)
+    text = ''.join(packer.sources)
+    assert '--- SAME FILE: c.py = a.py ---' in text
+    assert '--- BEGIN FILE: b.c ---' in text
@@ -0,0 +1,89 @@
+from makefile import parse_flags, parse_makefile, load_build
+
+def build(tmp_path, text, files=None, variables=None):
+    for rel, body in (files or {}).items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body)
+    mod = tmp_path / 'mod'
+    mod.mkdir(exist_ok=True)
+    (mod / 'Makefile').write_text(text)
+    return parse_makefile(str(mod / 'Makefile'), variables)
+
+def test_assignment_flavours(tmp_path):
+    b = build(tmp_path, 'A = a_$(B)\n'
+                        'B = one\n'
+                        'C := c_$(B)\n'
+                        'B = two\n'
+                        'D ?= d_first\n'
+                        'D ?= d_second\n'
+                        'E := e\n'
+                        'E += e_$(B)\n'
+                        'F = f\n'
+                        'F += f_$(B)\n'
+                        'B = three\n'
+                        'SRCS = $(A) $(C) $(D) $(E) $(F)\n')
+    # A、F 为递归展开，取最终的 B；C、E 在赋值时展开
+    assert b.srcs == ['a_three', 'c_one', 'd_first', 'e', 'e_two', 'f', 'f_three']
+
+def test_conditionals(tmp_path):
+    b = build(tmp_path, 'ARCH = rv32\n'
+                        'ifeq ($(ARCH),rv32)\n'
+                        'SRCS += a.c\n'
+                        'else ifeq ($(ARCH),rv64)\n'
+                        'SRCS += b.c\n'
+                        'else\n'
+                        'SRCS += c.c\n'
+                        'endif\n'
+                        'ifneq "$(ARCH)" "rv64"\n'
+                        'SRCS += d.c\n'
+                        'endif\n'
+                        'ifdef UNSET\n'
+                        'SRCS += e.c\n'
+                        'ifeq (1,1)\n'
+                        'SRCS += f.c\n'
+                        'endif\n'
+                        'endif\n'
+                        'ifndef UNSET\n'
+                        'SRCS += g.c\n'
+                        'endif\n')
+    assert b.srcs == ['a.c', 'd.c', 'g.c']
+
+def test_command_line_override(tmp_path):
+    b = build(tmp_path, 'ARCH = rv32\nifeq ($(ARCH),rv64)\nSRCS = wide.c\nelse\nSRCS = narrow.c\nendif\n',
+              variables={'ARCH': 'rv64'})
+    assert b.srcs == ['wide.c']
+
+def test_include_is_relative_to_top_makefile(tmp_path):
+    b = build(tmp_path, 'SRCS_C = main.c\ninclude ../common.mk\n-include missing.mk\n',
+              files={'common.mk': 'CFLAGS += -I./include -DDEBUG -DLEVEL=2 -UNDEBUG\n'
+                                  'include extra.mk\n'
+                                  '%.o: %.c\n\t$(CC) -T os.ld $< -o $@\n',
+                     'mod/extra.mk': 'SRCS_ASM = start.S\n'})
+    # common.mk 中的 include 同样相对 mod/（make 的工作目录），而不是 common.mk 所在目录
+    assert b.srcs == ['start.S', 'main.c']  # SRCS* 按变量名排序合并
+    assert b.include_dirs == ['include']
+    assert b.defines == {'DEBUG': '1', 'LEVEL': '2', 'NDEBUG': None}
+    assert b.ldscripts == ['os.ld']
+    # 实际读到的文件：missing.mk 不在其中
+    mod = tmp_path / 'mod'
+    assert b.files == [str(mod / 'Makefile'), str(tmp_path / 'common.mk'), str(mod / 'extra.mk')]
+
+def test_continuation_comments_and_config(tmp_path):
+    b = build(tmp_path, 'SRCS = a.c \\\n       b.c # trailing comment\n'
+                        'ifeq (0,1)\nCFLAGS += -DNEVER\nendif\n'
+                        'CFLAGS += -D USED\n')
+    assert b.srcs == ['a.c', 'b.c']
+    assert b.defines == {'USED': '1'}
+    # config 包括未生效分支中出现过的宏
+    assert b.config == ['NEVER', 'USED']
+
+def test_functions_expand_empty_and_no_makefile(tmp_path):
+    b = build(tmp_path, 'SRCS = $(wildcard *.c) kept.c\n')
+    assert b.srcs == ['kept.c']
+    assert load_build(str(tmp_path / 'nowhere')) is None
+
+def test_parse_flags():
+    dirs, defines = parse_flags(['-I', 'inc', '-Iother', '-DX', '-D', 'Y=3', '-UZ', '-O2'])
+    assert dirs == ['inc', 'other']
+    assert defines == {'X': '1', 'Y': '3', 'Z': None}
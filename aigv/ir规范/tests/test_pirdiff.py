@@ -0,0 +1,61 @@
+import shutil, subprocess
+
+import pytest
+
+import pirdiff
+
+def pir(units, code, symbols=()):
+    return {
+        'META': [('name', 'demo')],
+        'UNITS': [(f'u{i}', p, 'type=C') for i, p in enumerate(units)],
+        'SYMBOLS': list(symbols),
+        'CODE': [(f'u{i}', body, f'u{i}') for i, body in enumerate(code)],
+    }
+
+def test_diff_matches_units_by_path():
+    a = pir(['a.c', 'b.c'], ['int a;', 'int b;'], [('a', 'u0', 'func')])
+    b = pir(['b.c', 'c.c'], ['int b;', 'int c;'], [('c', 'u1', 'func')])
+    delta, stat = pirdiff.diff(a, b)
+    assert stat['UNITS'] == (1, 1, 1)  # c.c 新增，a.c 删除，b.c 编号变化
+    assert delta['CODE'] == [('u1', 'int c;', 'u1')]
+    assert ('UNITS:a.c',) in delta['REMOVED']
+    assert delta['SYMBOLS'] == [('c', 'u1', 'func')]
+
+def test_identical_inputs_give_meta_only():
+    a = pir(['a.c'], ['int a;'])
+    delta, _ = pirdiff.diff(a, a)
+    assert list(delta) == ['META']
+
+def test_load_rejects_non_pir(tmp_path):
+    (tmp_path / 'empty.pir').write_text('')
+    (tmp_path / 'notes.txt').write_text('hello\n')
+    for name in ('empty.pir', 'notes.txt'):
+        with pytest.raises(ValueError):
+            pirdiff.load(str(tmp_path / name))
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git 不可用')
+def test_rev_directory(tmp_path, monkeypatch):
+    def git(*args):
+        subprocess.run(['git', '-c', 'user.email=t@t', '-c', 'user.name=t', *args],
+                       cwd=tmp_path, check=True, capture_output=True)
+    (tmp_path / 'mod').mkdir()
+    (tmp_path / 'mod' / 'main.c').write_text('int main(void) { return 0; }\n')
+    git('init', '-q')
+    git('add', '-A')
+    git('commit', '-qm', 'one')
+    (tmp_path / 'mod' / 'extra.c').write_text('int extra(void) { return 1; }\n')
+    git('add', '-A')
+    git('commit', '-qm', 'two')
+    monkeypatch.chdir(tmp_path)
+
+    old, new = pirdiff.load('HEAD~1:mod'), pirdiff.load('HEAD:mod')
+    assert [p for _, p, _ in old['UNITS']] == ['main.c']
+    assert [p for _, p, _ in new['UNITS']] == ['extra.c', 'main.c']
+    # 导出的版本与工作区目录生成的 PIR 一致，包括 META 中的 root
+    assert new == pirdiff.load('mod')
+    # 不在被比较的树中留下缓存
+    assert not (tmp_path / 'mod' / '.pir-cache').exists()
+
+    # 目录在 git 中是 tree：不能被当作 PIR 文本静默解析成空 PIR
+    with pytest.raises(ValueError):
+        pirdiff.load('HEAD:mod/main.c')
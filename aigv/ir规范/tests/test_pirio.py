@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+import pirio
+
+PIR = {
+    'META': [('name', 'demo'), ('profile', 'os-riscv')],
+    'UNITS': [('u0', 'Makefile', ''), ('u1', 'src/main.c', 'type=C arch=core'),
+              ('u2', 'src/copy.c', 'type=C arch=core')],
+    'GRAPH': [('u1', 'include', 'os.h'), ('u2', 'include', 'u1')],
+    'DEPS': [('u1', '', 'u2'), ('u2', 'u1', '')],
+    'SYMBOLS': [('main', 'u1', 'func'), ('ns::x', 'u2', 'var')],
+    'CALLS': [('main', 'u1', 'uart_puts')],
+    'LAYOUT': [('ENTRY', '=', '_start'), ('.text', ':', '.text .text.*')],
+    'CODE': [('u1', 'int main(void)\n{\n    return 0;\n}', 'u1'), ('u2', '', 'u1')],
+    'NOTES': [('free-form line',)],
+}
+
+def text(pir):
+    buf = io.StringIO()
+    pirio.write_text(pir, buf)
+    return buf.getvalue()
+
+def test_text_round_trip():
+    s = text(PIR)
+    assert pirio.read_text(io.StringIO(s)) == PIR
+    assert text(pirio.read_text(io.StringIO(s))) == s
+
+def test_binary_round_trip():
+    buf = io.BytesIO()
+    pirio.write_bin(PIR, buf)
+    assert pirio.read_bin(io.BytesIO(buf.getvalue())) == PIR
+
+def test_save_load(tmp_path):
+    for name in ('a.pir', 'a.pirb'):
+        path = str(tmp_path / name)
+        pirio.save(PIR, path)
+        assert pirio.load(path) == PIR
+
+@pytest.mark.parametrize('src, line', [
+    ('garbage\n<PIR>\n</PIR>\n', 1),
+    ('<PIR>\n<META>\nname:x\n</META>\nstray\n</PIR>\n', 5),
+    ('<PIR>\n<GRAPH>\nu1 includes os.h\n</GRAPH>\n</PIR>\n', 3),
+    ('<PIR>\n<UNITS>\nMakefile\n</UNITS>\n</PIR>\n', 3),
+    ('<PIR>\n<SYMBOLS>\nmain u1\n</SYMBOLS>\n</PIR>\n', 3),
+    ('<PIR>\n<DEPS>\nu1 deps=u2\n</DEPS>\n</PIR>\n', 3),
+    ('<PIR>\n<META>\nname\n</META>\n</PIR>\n', 3),
+    ('<PIR>\n<CODE>\nint x;\n</CODE>\n</PIR>\n', 3),
+    ('<PIR>\n<META>\n</UNITS>\n</PIR>\n', 3),
+    ('<PIR>\n<META>\n<UNITS>\n</UNITS>\n</PIR>\n', 3),
+    ('<PIR>\n<CODE>\n<u1>\nint x;\n', 3),
+    ('<PIR>\n<META>\nname:x\n', 3),
+])
+def test_malformed_text(src, line):
+    with pytest.raises(ValueError, match=f'^line {line}: '):
+        pirio.read_text(io.StringIO(src))
+
+def test_truncated_binary():
+    buf = io.BytesIO()
+    pirio.write_bin(PIR, buf)
+    data = buf.getvalue()
+    for cut in (6, len(data) // 2, len(data) - 1):
+        with pytest.raises(ValueError):
+            pirio.read_bin(io.BytesIO(data[:cut]))
@@ -0,0 +1,63 @@
+from ppcond import prune, evaluate, UNKNOWN
+
+def lines(*ls):
+    return '\n'.join(ls)
+
+def test_no_conditionals_returned_as_is():
+    text = 'int a;\n#define X 1\n'
+    assert prune(text, {}) is text
+
+def test_known_if_else_cut_keeps_line_count():
+    src = lines('#if A', 'a', '#else', 'b', '#endif', 'c')
+    out = prune(src, {'A': '1'})
+    assert out.split('\n') == ['', 'a', '', '', '', 'c']
+    assert prune(src, {'A': None}).split('\n') == ['', '', '', 'b', '', 'c']
+
+def test_unknown_condition_kept_verbatim():
+    src = lines('#ifndef GUARD_H', '#define GUARD_H', 'int a;', '#endif')
+    assert prune(src, {}) == src
+
+def test_ifdef_ifndef():
+    src = lines('#ifdef A', 'a', '#endif', '#ifndef A', 'b', '#endif')
+    assert prune(src, {'A': '1'}).split('\n') == ['', 'a', '', '', '', '']
+    assert prune(src, {'A': None}).split('\n') == ['', '', '', '', 'b', '']
+
+def test_elif_with_unknown_macro_becomes_if():
+    src = lines('#if A', 'a', '#elif B', 'b', '#else', 'c', '#endif')
+    out = prune(src, {'A': None})
+    assert out.split('\n') == ['', '', '#if B', 'b', '#else', 'c', '#endif']
+
+def test_elif_after_taken_branch_is_cut():
+    src = lines('#if A', 'a', '#elif B', 'b', '#endif')
+    assert prune(src, {'A': '1'}).split('\n') == ['', 'a', '', '', '']
+
+def test_three_valued_logic():
+    look = {'A': '1', 'Z': None}.get
+    lookup = lambda n: look(n) if n in ('A', 'Z') else UNKNOWN
+    assert evaluate('A || U', lookup) == 1
+    assert evaluate('Z && U', lookup) == 0
+    assert evaluate('A && U', lookup) is None
+    assert evaluate('Z || U', lookup) is None
+    assert evaluate('defined(A) && !defined(Z)', lookup) == 1
+    assert evaluate('A == 1 ? 2 : 3', lookup) == 2
+    assert evaluate('A +', lookup) is None  # 无法解析视为未知
+
+def test_local_define_and_undef():
+    src = lines('#define FOO 2', '#if FOO > 1', 'a', '#endif',
+                '#undef FOO', '#ifdef FOO', 'b', '#endif')
+    out = prune(src, {})
+    assert out.split('\n') == ['#define FOO 2', '', 'a', '', '#undef FOO', '', '', '']
+
+def test_define_under_unknown_branch_makes_macro_unknown():
+    src = lines('#ifdef U', '#define FOO', '#endif', '#ifdef FOO', 'a', '#endif')
+    assert prune(src, {'FOO': None}) == src
+
+def test_unbalanced_returned_unchanged():
+    for src in (lines('#if A', 'a'), lines('a', '#endif'), lines('#else', '#if A', '#endif')):
+        assert prune(src, {'A': '1'}) == src
+
+def test_continuation_lines():
+    src = lines('#if A && \\', '    B', 'x', '#else', 'y \\', 'z', '#endif', 'w')
+    out = prune(src, {'A': '1', 'B': None})
+    assert out.split('\n') == ['', '', '', '', 'y \\', 'z', '', 'w']
+    assert len(out.split('\n')) == len(src.split('\n'))
@@ -0,0 +1,37 @@
+from cdecl import skeleton
+from minify import minify_c
+
+def skel(src):
+    return skeleton(minify_c(src))
+
+def test_function_bodies_collapse():
+    src = ('static inline int g(int x) { if (x) { return f(x); } return 0; }\n'
+           'int main(void)\n{\n    const char *s = "} {";\n    return g(1);\n}\n')
+    assert skel(src) == 'static inline int g(int x){...}int main(void){...}'
+
+def test_declarations_are_kept():
+    src = ('#define MAX(a,b) ((a)>(b)?(a):(b))\n'
+           'struct task { int id; struct { int x; } in; };\n'
+           'enum { A = 1, B };\n'
+           'static int table[] = { 1, 2, 3 };\n'
+           'struct task boot = { .id = 0 };\n'
+           'extern int f(int);\n'
+           'int (*handler)(int) = g;\n')
+    assert skel(src) == minify_c(src)
+
+def test_attribute_before_name():
+    src = 'void __attribute__((noreturn)) panic(char *s) { while (1) {} }\n'
+    assert skel(src) == 'void __attribute__((noreturn))panic(char*s){...}'
+
+def test_preprocessor_lines_survive_between_bodies():
+    src = ('#ifdef DEBUG\nvoid log(void) { puts("x"); }\n#else\n'
+           'void log(void) {}\n#endif\n')
+    assert skel(src) == '#ifdef DEBUG\nvoid log(void){...}\n#else\nvoid log(void){...}\n#endif'
+
+def test_macro_without_semicolon_before_struct():
+    src = ('DECLARE_X(foo)\nstruct s { int a; };\n'
+           'LIST_HEAD(l)\ntypedef union { int i; } u_t;\n'
+           'DEFINE_Y(bar)\nstatic int f(void) { return 0; }\n')
+    assert skel(src) == ('DECLARE_X(foo)struct s{int a;};'
+                         'LIST_HEAD(l)typedef union{int i;}u_t;'
+                         'DEFINE_Y(bar)static int f(void){...}')
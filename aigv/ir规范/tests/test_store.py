@@ -0,0 +1,92 @@
+import os, sqlite3
+
+import store
+from store import Store, open_store, SCHEMA_VERSION
+
+def entry(digest='h1', code='int a;'):
+    return {'hash': digest, 'version': 'v1', 'code': code, 'deps': ['a.h'],
+            'symbols': [['a', 'var', 1]], 'calls': [], 'layout': None,
+            'file': 'a.c', 'lang': 'C'}
+
+def test_put_get_round_trip(tmp_path):
+    db = str(tmp_path / 's.db')
+    with Store(db) as s:
+        s.put(entry(), '.c', '')
+    with Store(db) as s:
+        assert s.get('h1', '.c', '', 'v1') == entry()
+        assert s.has('h1', '.c', '', 'v1')
+        assert s.get('h1', '.c', 'other', 'v1') is None
+
+def test_version_mismatch_returns_none(tmp_path):
+    with Store(str(tmp_path / 's.db')) as s:
+        s.put(entry(), '.c', '')
+        s.flush()
+        assert s.get('h1', '.c', '', 'v2') is None
+        assert not s.has('h1', '.c', '', 'v2')
+
+def test_digest_follows_stat(tmp_path):
+    db, src = str(tmp_path / 's.db'), tmp_path / 'a.c'
+    src.write_text('int a;')
+    with Store(db) as s:
+        assert s.digest(str(src)) is None
+        s.stamp(str(src), 'abc')
+    with Store(db) as s:
+        assert s.digest(str(src)) == 'abc'
+    src.write_text('int ab;')
+    with Store(db) as s:
+        assert s.digest(str(src)) is None
+
+def test_verdict_and_sniffed(tmp_path):
+    db, src = str(tmp_path / 's.db'), tmp_path / 'a.bin'
+    src.write_bytes(b'\0\1')
+    st = os.stat(src)
+    with Store(db) as s:
+        assert s.verdict(str(src), st) is None
+        s.sniffed(str(src), st, 'binary')
+    with Store(db) as s:
+        assert s.verdict(str(src), st) == 'binary'
+        assert s.digest(str(src)) is None  # 检查过但从未哈希
+        s.stamp(str(src), 'abc')
+        assert s.verdict(str(src), st) == 'binary'  # 哈希不覆盖检查结果
+    src.write_bytes(b'text')
+    with Store(db) as s:
+        assert s.verdict(str(src), os.stat(src)) is None
+
+def test_old_schema_is_rebuilt(tmp_path):
+    db = str(tmp_path / 's.db')
+    con = sqlite3.connect(db)
+    con.execute('CREATE TABLE units (path TEXT PRIMARY KEY, mtime_ns, size, hash)')
+    con.execute("INSERT INTO units VALUES ('x', 1, 2, 'h')")
+    con.execute('PRAGMA user_version=1')
+    con.commit()
+    con.close()
+    with Store(db) as s:
+        assert s.stamps == {}
+        assert s.db.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+        s.put(entry(), '.c', '')
+    with Store(db) as s:
+        assert s.get('h1', '.c', '', 'v1') == entry()
+
+def test_migration_rechecks_version_under_lock(tmp_path):
+    # 另一个进程在本进程读版本之后、拿到写锁之前已完成建表并写入
+    db = str(tmp_path / 's.db')
+    a = Store(db)
+    b = Store(db)
+    a.put(entry(), '.c', '')
+    a.flush()
+    b._migrate()
+    assert b.get('h1', '.c', '', 'v1') == entry()
+    a.close()
+    b.close()
+
+def test_concurrent_stores_keep_both_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(store, 'BATCH', 1)
+    a = open_store(str(tmp_path / 'cache'))
+    b = open_store(str(tmp_path / 'cache'))
+    a.put(entry('h1'), '.c', '')
+    b.put(entry('h2', 'int b;'), '.c', '')
+    a.close()
+    b.close()
+    with open_store(str(tmp_path / 'cache')) as s:
+        assert s.get('h1', '.c', '', 'v1')['code'] == 'int a;'
+        assert s.get('h2', '.c', '', 'v1')['code'] == 'int b;'
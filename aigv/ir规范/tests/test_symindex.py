@@ -0,0 +1,18 @@
+from collections import Counter
+
+from symindex import build_index, query
+
+def test_include_paths_are_precomputed():
+    units = [('u0', 'main.c'), ('u1', 'os.h'), ('u2', 'types.h'), ('u3', 'other.c')]
+    defs = [('reg_t', 'u2', 'typedef', 'def', (1, 1)),
+            ('uart_init', 'u1', 'func', 'proto', (3, 3))]
+    uses = {'u0': Counter(reg_t=2, uart_init=1), 'u3': Counter(reg_t=1)}
+    edges = [('u0', 'os.h', 'u1'), ('u1', 'types.h', 'u2'), ('u0', 'stdio.h', None)]
+    idx = build_index(units, defs, uses, edges)
+    assert idx['refs']['reg_t'] == [['u0', ['u0', 'u1', 'u2']], ['u3', None]]
+
+    # 查询只取索引中的结果，不再遍历 include 图
+    del idx['includes']
+    assert query(idx, 'reg_t')['refs'] == [['u0', ['u0', 'u1', 'u2']], ['u3', None]]
+    assert query(idx, 'uart_init')['refs'] == [['u0', ['u0', 'u1']]]
+    assert query(idx, 'nope') is None
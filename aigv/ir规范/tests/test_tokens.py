@@ -0,0 +1,49 @@
+import sys, types, socket
+
+import pytest
+
+import tokens
+
+@pytest.fixture
+def estimators():
+    tokens.get_estimator.cache_clear()
+    yield tokens.get_estimator
+    tokens.get_estimator.cache_clear()
+
+@pytest.fixture
+def fake_tiktoken(monkeypatch):
+    """get_encoding 在编码表未缓存时会去解析下载地址的替身"""
+    mod = types.ModuleType('tiktoken')
+    mod.cached = False
+
+    def get_encoding(name):
+        if not mod.cached:
+            socket.getaddrinfo('openaipublic.blob.core.windows.net', 443)
+        return types.SimpleNamespace(encode=lambda s, disallowed_special=(): s.split())
+    mod.get_encoding = get_encoding
+    monkeypatch.setitem(sys.modules, 'tiktoken', mod)
+    monkeypatch.setattr(socket, 'getaddrinfo', lambda *a, **kw: [])
+    return mod
+
+def test_builtin_estimators(estimators):
+    assert estimators('chars') == ('chars', tokens.estimate_tokens)
+    assert estimators('chars')[1]('abcdefgh') == 2
+    assert estimators('bpe')[1]('int main(void)') > 0
+    with pytest.raises(ValueError):
+        estimators('nope')
+
+def test_auto_never_downloads(estimators, fake_tiktoken):
+    assert estimators('auto')[0] == 'bpe'
+    # 探测结束后网络恢复，显式的 tiktoken 可以下载
+    name, count = estimators('tiktoken')
+    assert name == 'tiktoken' and count('a b c') == 3
+
+def test_auto_uses_cached_encoding(estimators, fake_tiktoken):
+    fake_tiktoken.cached = True
+    assert estimators('auto')[0] == 'tiktoken'
+
+def test_auto_without_tiktoken(estimators, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'tiktoken', None)
+    assert estimators('auto')[0] == 'bpe'
+    with pytest.raises(ValueError):
+        estimators('tiktoken')
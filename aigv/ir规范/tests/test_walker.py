@@ -0,0 +1,89 @@
+import os, shutil, subprocess
+
+import pytest
+
+from walker import Walker, parse_gitignore, walk
+
+def make_tree(root, files):
+    for rel, text in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+def listing(root, **kw):
+    out = []
+    for r, ds, fs in walk(str(root), **kw):
+        rel = os.path.relpath(r, root)
+        out += [f if rel == '.' else f'{rel}/{f}'.replace(os.sep, '/') for f in fs]
+    return sorted(out)
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / '.git' / 'info').mkdir(parents=True)
+    return tmp_path
+
+def test_unanchored_and_anchored(repo):
+    make_tree(repo, {
+        '.gitignore': '*.o\n/top.log\ndocs/*.md\n',
+        'a.c': '', 'a.o': '', 'sub/b.o': '', 'top.log': '', 'sub/top.log': '',
+        'docs/x.md': '', 'docs/deep/y.md': '', 'sub/docs/z.md': '',
+    })
+    assert listing(repo) == ['.gitignore', 'a.c', 'docs/deep/y.md', 'sub/docs/z.md', 'sub/top.log']
+
+def test_negation_and_order(repo):
+    make_tree(repo, {
+        '.gitignore': '*.o\n!keep.o\n',
+        'a.o': '', 'keep.o': '', 'sub/keep.o': '',
+    })
+    assert listing(repo) == ['.gitignore', 'keep.o', 'sub/keep.o']
+
+def test_negation_cannot_reinclude_under_ignored_dir(repo):
+    make_tree(repo, {
+        '.gitignore': 'out/\n!out/keep.c\n',
+        'out/keep.c': '', 'src/out': '',
+    })
+    # 目录被忽略后整棵子树不再进入；同名的普通文件不受 'out/' 影响
+    assert listing(repo) == ['.gitignore', 'src/out']
+
+def test_double_star_and_escapes(repo):
+    make_tree(repo, {
+        '.gitignore': '**/gen\nlogs/**\n\\#notes\nspace\\ \n# comment\n',
+        'gen/a.c': '', 'x/y/gen/b.c': '', 'logs/l1/x.txt': '', 'logs.c': '',
+        '#notes': '', 'space ': '', 'space': '',
+    })
+    assert listing(repo) == ['.gitignore', 'logs.c', 'space']
+
+def test_nested_gitignore_is_relative_to_its_dir(repo):
+    make_tree(repo, {
+        '.gitignore': '*.tmp\n',
+        'mod/.gitignore': '/local.c\n!want.tmp\n',
+        'mod/local.c': '', 'mod/sub/local.c': '', 'mod/want.tmp': '', 'other.tmp': '',
+        'local.c': '',
+    })
+    assert listing(repo) == ['.gitignore', 'local.c', 'mod/.gitignore', 'mod/sub/local.c',
+                             'mod/want.tmp']
+
+def test_walk_from_subdirectory_applies_parent_rules(repo):
+    make_tree(repo, {
+        '.gitignore': 'mod/build.c\n*.bak\n',
+        '.git/info/exclude': 'secret.c\n',
+        'mod/build.c': '', 'mod/main.c': '', 'mod/x.bak': '', 'mod/secret.c': '',
+    })
+    assert listing(repo / 'mod') == ['main.c']
+
+def test_hidden_and_ignore_dirs(repo):
+    make_tree(repo, {'.env': '', 'build/a.c': '', 'src/.cache/b.c': '', 'src/c.c': ''})
+    assert listing(repo, ignore_dirs={'build'}, hidden=False) == ['src/c.c']
+    assert listing(repo, gitignore=False) == ['.env', 'build/a.c', 'src/.cache/b.c', 'src/c.c']
+
+def test_parse_gitignore_flags():
+    rules = parse_gitignore('!keep/\n/a/b\n\n#x\n')
+    assert [(neg, dir_only) for _, neg, dir_only, _ in rules] == [(True, True), (False, False)]
+    assert rules[1][0].match('a/b') and not rules[1][0].match('x/a/b')
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='git 不可用')
+def test_git_mode_matches_ls_files(tmp_path):
+    make_tree(tmp_path, {'.gitignore': '*.o\n', 'a.c': '', 'b.o': '', 'd/e.c': ''})
+    subprocess.run(['git', 'init', '-q', str(tmp_path)], check=True)
+    assert listing(tmp_path, git=True) == ['.gitignore', 'a.c', 'd/e.c']
+    assert Walker(str(tmp_path), git=True)._allowed >= {'d', 'd/e.c'}
@@ -0,0 +1,82 @@
+import os, re, sys, socket
+from contextlib import contextmanager
+from functools import lru_cache
+
+# ===== token 估算 =====
+# 可插拔估算器：
+#   chars    约 4 字符 / token，最快；ir规范/os.py 的 --max-tokens 预算沿用它，输出保持稳定
+#   bpe      内置的字节对编码近似：按 cl100k 类分词器的切分习惯把文本切成片段，每片算 1 个 token
+#   tiktoken 本地装有 tiktoken 且编码表可用时的精确计数
+# auto 只在 tiktoken 已安装且不联网就能加载编码表（已在本地缓存）时使用它，否则退回 bpe，不会触发下载；
+# 显式指定 tiktoken 时允许 tiktoken 首次使用时联网下载编码表。
+
+def estimate_tokens(s):
+    return (len(s) + 3) // 4
+
+# 每个分支匹配的片段近似一个 token：
+#   驼峰 / 长单词按 6 个字母切块；数字每 3 位一块；标点两两合并；
+#   连续空白（换行 + 缩进）算一块，单个空格并入后面的单词不计；非 ASCII 字符各算一块
+_BPE = re.compile(r'[A-Z]?[a-z]{1,6}|[A-Z]{1,6}|\d{1,3}'
+                  r'|[^A-Za-z\d\s\x80-\U0010ffff]{1,2}|\s\s+|[^\S ]|[^\x00-\x7f]')
+
+def bpe_tokens(s):
+    return len(_BPE.findall(s))
+
+ESTIMATORS = {'chars': estimate_tokens, 'bpe': bpe_tokens}
+
+ENCODING = 'cl100k_base'
+
+@contextmanager
+def _offline():
+    """期间任何联网尝试（DNS 解析或建立连接）都立即失败"""
+    def refuse(*args, **kwargs):
+        raise OSError('auto 估算器不联网')
+    saved = socket.getaddrinfo, socket.create_connection, socket.socket.connect
+    socket.getaddrinfo = socket.create_connection = socket.socket.connect = refuse
+    try:
+        yield
+    finally:
+        socket.getaddrinfo, socket.create_connection, socket.socket.connect = saved
+
+def _tiktoken(encoding=ENCODING, offline=False):
+    import tiktoken
+    # 不去猜 tiktoken 的缓存布局：直接加载，offline 时需要下载就会失败
+    if offline:
+        with _offline():
+            enc = tiktoken.get_encoding(encoding)
+    else:
+        enc = tiktoken.get_encoding(encoding)
+    return lambda s: len(enc.encode(s, disallowed_special=()))
+
+@lru_cache(maxsize=None)
+def get_estimator(name='auto'):
+    """返回 (实际使用的名称, 计数函数)"""
+    if name in ESTIMATORS:
+        return name, ESTIMATORS[name]
+    if name in ('auto', 'tiktoken'):
+        try:
+            return 'tiktoken', _tiktoken(offline=name == 'auto')
+        except Exception as e:  # 未安装、编码表未缓存，或下载失败
+            if name == 'tiktoken':
+                raise ValueError(f'tiktoken 不可用: {e}') from e
+            return 'bpe', bpe_tokens
+    raise ValueError(f'未知的 token 估算器: {name}')
+
+if __name__ == '__main__':
+    # 对比各估算器在原文与压缩结果上的计数：python tokens.py FILE...
+    from minify import minify_code
+    names = ['chars', 'bpe']
+    try:
+        names.append(get_estimator('tiktoken')[0])
+    except ValueError:
+        pass
+    print(f"{'file':<40}" + ''.join(f'{n + " raw":>14}{n + " min":>14}' for n in names))
+    for p in sys.argv[1:]:
+        with open(p, 'r', encoding='utf-8', errors='ignore') as fd:
+            raw = fd.read()
+        mini = minify_code(raw, os.path.splitext(p)[1])
+        row = ''
+        for n in names:
+            count = get_estimator(n)[1]
+            row += f'{count(raw):>14}{count(mini):>14}'
+        print(f'{p[-40:]:<40}{row}')
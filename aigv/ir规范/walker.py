@@ -0,0 +1,209 @@
+import os, re, subprocess
+
+# ===== 共享目录遍历 =====
+# d.py / ir规范/os.py / 初版/* 共用。忽略规则在进入目录之前判断，被忽略的子树整体跳过：
+#   ignore_dirs    目录名集合（build、.git 等）
+#   hidden=False   跳过以 '.' 开头的文件与目录
+#   gitignore      遵循仓库顶层到当前目录沿途的 .gitignore 以及 .git/info/exclude，
+#                  规则编译成正则，后出现 / 更深层的规则优先，'!' 取反
+#   git=True       改用 `git ls-files -co --exclude-standard` 的结果作为允许集合，
+#                  不在仓库中或 git 不可用时退回 gitignore 匹配
+# walk() 与 os.walk 接口一致（自顶向下、不进入目录符号链接），调用方仍可原地修改 dirnames。
+
+def _glob_re(pat):
+    out, i, n = [], 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if pat.startswith('**/', i):
+            out.append('(?:.*/)?')
+            i += 3
+        elif pat.startswith('**', i):
+            out.append('.*')
+            i += 2
+        elif c == '*':
+            out.append('[^/]*')
+            i += 1
+        elif c == '?':
+            out.append('[^/]')
+            i += 1
+        elif c == '[':
+            j = pat.find(']', i + 2)
+            if j < 0:
+                out.append(r'\[')
+                i += 1
+            else:
+                body = pat[i + 1:j].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                out.append(f'[{body}]')
+                i = j + 1
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pat[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return ''.join(out)
+
+def parse_gitignore(text, base=''):
+    """返回 [(regex, 取反, 仅目录, base)]；base 为 .gitignore 所在目录（相对仓库顶层）"""
+    rules = []
+    for line in text.splitlines():
+        line = re.sub(r'(?<!\\) +$', '', line)
+        if not line or line.startswith('#'):
+            continue
+        neg = line.startswith('!')
+        if neg:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        # 含 '/'（末尾除外）的模式相对 .gitignore 所在目录锚定，否则匹配任意层级的名字
+        anchored = '/' in line
+        line = line.lstrip('/')
+        rx = re.compile(('' if anchored else '(?:.*/)?') + _glob_re(line) + r'\Z')
+        rules.append((rx, neg, dir_only, base))
+    return rules
+
+def _read_rules(path, base):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as fd:
+            return parse_gitignore(fd.read(), base)
+    except OSError:
+        return []
+
+def find_repo(path):
+    """向上查找包含 .git 的目录，找不到返回 None"""
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(path, '.git')):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+def git_files(root):
+    """root 下未被忽略的文件（已跟踪 + 未跟踪），相对 root；不是 git 仓库时返回 None"""
+    try:
+        out = subprocess.run(['git', '-C', root, 'ls-files', '-z', '-co', '--exclude-standard'],
+                             capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return [p for p in os.fsdecode(out).split('\0') if p]
+
+class Walker:
+    def __init__(self, root, ignore_dirs=(), hidden=True, gitignore=True, git=False):
+        self.top = root  # walk() 原样使用调用方给出的路径，与 os.walk 一致
+        self.root = os.path.abspath(root)
+        self.ignore_dirs = set(ignore_dirs)
+        if gitignore or git:
+            self.ignore_dirs.add('.git')  # 与 git 一致：仓库元数据本身不参与遍历
+        self.hidden = hidden
+        self.gitignore = gitignore
+        self._rules = {}    # 相对 root 的目录 -> 适用的规则
+        self._allowed = None  # git 模式：允许的相对路径（文件及其所有上级目录）
+
+        if git:
+            files = git_files(self.root)
+            if files is not None:
+                allowed = set()
+                for f in files:
+                    allowed.add(f)
+                    d = os.path.dirname(f)
+                    while d and d not in allowed:
+                        allowed.add(d)
+                        d = os.path.dirname(d)
+                self._allowed = allowed
+                return
+
+        if gitignore:
+            top = find_repo(self.root) or self.root
+            self._prefix = os.path.relpath(self.root, top).replace(os.sep, '/')
+            if self._prefix == '.':
+                self._prefix = ''
+            # 仓库顶层到 root 的上一级目录：这些 .gitignore 同样作用于 root 以下
+            rules = _read_rules(os.path.join(top, '.git', 'info', 'exclude'), '')
+            d, base = top, ''
+            for part in self._prefix.split('/') if self._prefix else ():
+                rules += _read_rules(os.path.join(d, '.gitignore'), base)
+                d = os.path.join(d, part)
+                base = f'{base}/{part}' if base else part
+            self._top_rules = rules
+
+    def _rules_for(self, rel):
+        rules = self._rules.get(rel)
+        if rules is None:
+            parent = self._top_rules if not rel else self._rules_for(os.path.dirname(rel))
+            base = '/'.join(p for p in (self._prefix, rel.replace(os.sep, '/')) if p)
+            rules = parent + _read_rules(os.path.join(self.root, rel, '.gitignore'), base)
+            self._rules[rel] = rules
+        return rules
+
+    def _ignored(self, rules, path, is_dir):
+        # 后出现的规则优先：倒序找到第一个匹配的规则即可
+        for rx, neg, dir_only, base in reversed(rules):
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not path.startswith(base + '/'):
+                    continue
+                sub = path[len(base) + 1:]
+            else:
+                sub = path
+            if rx.match(sub):
+                return not neg
+        return False
+
+    def entries(self, dirpath):
+        """dirpath 下未被忽略的 DirEntry（scandir 顺序）；目录不可读时返回空列表"""
+        rel = os.path.relpath(dirpath, self.root)
+        rel = '' if rel == '.' else rel
+        try:
+            with os.scandir(dirpath) as it:
+                listing = list(it)
+        except OSError:
+            return []
+
+        rules = self._rules_for(rel) if self._allowed is None and self.gitignore else None
+        out = []
+        for e in listing:
+            name = e.name
+            if not self.hidden and name.startswith('.'):
+                continue
+            try:
+                is_dir = e.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir and name in self.ignore_dirs:
+                continue
+            child = os.path.join(rel, name) if rel else name
+            if self._allowed is not None:
+                if child not in self._allowed:
+                    continue
+            elif rules:
+                path = '/'.join(p for p in (self._prefix, child.replace(os.sep, '/')) if p)
+                if self._ignored(rules, path, is_dir):
+                    continue
+            out.append(e)
+        return out
+
+    def walk(self, top=None):
+        """与 os.walk(top) 相同的 (dirpath, dirnames, filenames) 序列，忽略的条目已剔除"""
+        top = top or self.top
+        dirs, files = [], []
+        for e in self.entries(top):
+            try:
+                is_dir = e.is_dir()
+            except OSError:
+                is_dir = False
+            (dirs if is_dir else files).append(e.name)
+        yield top, dirs, files
+        for d in dirs:
+            path = os.path.join(top, d)
+            if not os.path.islink(path):
+                yield from self.walk(path)
+
+def walk(root, ignore_dirs=(), hidden=True, gitignore=True, git=False):
+    return Walker(root, ignore_dirs, hidden, gitignore, git).walk()
@@ -4,6 +4,11 @@ import sys
 import argparse
 import re
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ir规范'))
+from minify import strip_c_comments
+from fileio import sniff, MAX_FILE_SIZE
+from walker import Walker
+
 # 定义二进制文件扩展名
 BINARY_EXTENSIONS = {
     '.o', '.a', '.bin', '.elf', '.img', '.iso', '.zip', '.tar', '.gz', 
@@ -18,46 +23,42 @@ def is_binary_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in BINARY_EXTENSIONS
 
+# 预编译的注释模式 (C 风格注释由共享的 strip_c_comments 处理，字符串内的 // 不受影响)
+HASH_COMMENT = re.compile(r'#.*')
+HTML_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+
 def remove_comments(content):
     """
     移除代码中的注释
     支持C/C++/Java/JavaScript/Python等多种语言的注释
     """
-    # 移除多行注释 /* ... */
-    content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-
-    # 移除单行注释 // ...
-    content = re.sub(r'//.*', '', content)
+    # 移除 /* ... */ 与 // ...
+    content = strip_c_comments(content, '')
 
-    # 移除Python风格的注释 # ...
-    content = re.sub(r'#.*', '', content)
-
-    # 移除Makefile中的注释 # ...
-    content = re.sub(r'^\s*#.*', '', content, flags=re.MULTILINE)
+    # 移除Python/Makefile/Shell风格的注释 # ...
+    content = HASH_COMMENT.sub('', content)
 
     # 移除HTML/XML注释 <!-- ... -->
-    content = re.sub(r'<!--.*?-->', '', content, flags=re.DOTALL)
-
-    # 移除Shell脚本注释 # ...
-    content = re.sub(r'^\s*#.*$', '', content, flags=re.MULTILINE)
+    content = HTML_COMMENT.sub('', content)
 
     return content
 
-def process_directory(directory, output_file):
+def process_directory(directory, output_file, max_size=MAX_FILE_SIZE):
     """
     处理指定目录，将所有文件名和内容按照指定格式写入输出文件
 
     Args:
         directory (str): 要处理的目录路径
         output_file (str): 输出文件路径
+        max_size (int): 超过此字节数的文件跳过，None 表示不限
     """
     # 获取目录下所有文件，按名称排序
     files = []
-    for filename in sorted(os.listdir(directory)):
+    for filename in sorted(e.name for e in Walker(directory).entries(directory)):
         filepath = os.path.join(directory, filename)
         if os.path.isfile(filepath):
-            # 跳过二进制文件
-            if is_binary_file(filename):
+            # 跳过二进制文件：先看扩展名，再看大小与前 4 KiB (NUL / ELF 等魔数)
+            if is_binary_file(filename) or sniff(filepath, max_size):
                 continue
             files.append(filename)
 
@@ -91,6 +92,8 @@ def main():
     parser = argparse.ArgumentParser(description='将指定目录中的所有文件名和内容合并到一个文本文件中')
     parser.add_argument('directory', help='要处理的目录路径')
     parser.add_argument('-o', '--output', default='daima.txt', help='输出文件名 (默认: daima.txt)')
+    parser.add_argument('--max-file-size', type=int, default=MAX_FILE_SIZE,
+                        help=f'跳过超过此字节数的文件，0 表示不限 (默认: {MAX_FILE_SIZE})')
 
     args = parser.parse_args()
 
@@ -101,7 +104,7 @@ def main():
 
     # 处理目录
     print(f"正在处理目录: {args.directory}")
-    process_directory(args.directory, args.output)
+    process_directory(args.directory, args.output, args.max_file_size or None)
     print(f"处理完成，结果已保存到: {args.output}")
 
 if __name__ == "__main__":
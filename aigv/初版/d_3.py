@@ -1,4 +1,9 @@
-import os,re,argparse
+import os,re,sys,argparse
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','ir规范'))
+from cdecl import parse_funcs
+from minify import minify_c
+from walker import walk
 
 SRC_EXT={'.c','.h','.S','.ld','Makefile'}
 IGN={'.git','build','dist','__pycache__','.vscode'}
@@ -9,37 +14,12 @@ def classify(path):
         if f"/{k}/" in path: return k
     return 'other'
 
-def strip_comments(s):
-    s=re.sub(r'/\*.*?\*/','',s,flags=re.S)
-    s=re.sub(r'//.*','',s)
-    return s
-
-def minify_c(s):
-    s=strip_comments(s)
-    lines=[]
-    buf=[]
-    for l in s.splitlines():
-        l=l.strip()
-        if not l:continue
-        if l.startswith('#'):
-            if buf:lines.append(" ".join(buf));buf=[]
-            lines.append(l)
-        else:buf.append(l)
-    if buf:lines.append(" ".join(buf))
-    s="\n".join(lines)
-    s=re.sub(r'\s*([=+\-*/%&|^!<>?:;,(){}\[\]])\s*',r'\1',s)
-    return s
-
-def parse_funcs(s):
-    return re.findall(r'\b([a-zA-Z_][\w\s\*]+?)\s+([a-zA-Z_]\w*)\s*\(',s)
-
 def parse_includes(s):
     return re.findall(r'#include\s+[<"](.+?)[>"]',s)
 
 def main(root,out):
     index,includes,funcs,code=[],[],[],[]
-    for r,ds,fs in os.walk(root):
-        ds[:]=[d for d in ds if d not in IGN]
+    for r,ds,fs in walk(root,IGN):
         for f in fs:
             if f.endswith(tuple(SRC_EXT)):
                 p=os.path.join(r,f)
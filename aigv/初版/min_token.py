@@ -1,8 +1,11 @@
 import os
 import sys
 import argparse
-import re
-import ast
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ir规范'))
+from minify import minify_c as minify_c_style, minify_python
+from tokens import get_estimator
+from walker import walk
 
 # === 配置区域 ===
 
@@ -29,107 +32,23 @@ def is_source_file(filename):
     _, ext = os.path.splitext(filename)
     return ext in EXTENSIONS
 
-def strip_c_comments(text):
-    """移除 C/C++/Assembly 风格的注释 (// 和 /* */)"""
-    def replacer(match):
-        s = match.group(0)
-        if s.startswith('/'):
-            return " " # 用一个空格代替注释，防止粘连
-        else:
-            return s
-    pattern = re.compile(
-        r'//.*?$|/\*.*?\*/|\'(?:\\.|[^\\\'])*\'|"(?:\\.|[^\\"])*"',
-        re.DOTALL | re.MULTILINE
-    )
-    return re.sub(pattern, replacer, text)
-
-def minify_c_style(content):
-    """
-    极致压缩 C/C++/汇编 代码
-    策略：
-    1. 移除所有注释
-    2. 移除每行首尾空格
-    3. 将非预处理指令的换行符替换为仅仅一个空格（如果安全）
-    4. 压缩操作符周围的空格
-    """
-    # 1. 移除注释
-    content = strip_c_comments(content)
-    
-    lines = content.split('\n')
-    minified_lines = []
-    current_line_buffer = []
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        # 2. 处理预处理指令 (必须换行)
-        if line.startswith('#'):
-            # 如果缓冲区有内容，先刷入（作为上一行）
-            if current_line_buffer:
-                minified_lines.append(" ".join(current_line_buffer))
-                current_line_buffer = []
-            minified_lines.append(line) # 宏定义单独一行
-        else:
-            # 3. 普通代码，尝试拼接到一行
-            # 汇编标签 (Label:) 最好保留换行或空格，这里统一用空格拼接
-            current_line_buffer.append(line)
-    
-    if current_line_buffer:
-        minified_lines.append(" ".join(current_line_buffer))
-
-    # 合并结果
-    text = "\n".join(minified_lines)
-
-    # 4. 进一步压缩符号周围的空格 (Token 压榨核心)
-    # 将 "a = b + c" 变为 "a=b+c"
-    # 注意：不能处理字符串内部，但既然是给AI看，轻微破坏字符串格式通常可接受，除非是硬编码数据
-    ops = r'=|\+|-|\*|/|%|&|\||\^|!|<|>|\?|:|;|,|\(|\)|\{|\}|\[|\]'
-    text = re.sub(f'\s*({ops})\s*', r'\1', text)
-    
-    # 修正：关键字与变量间的空格必须保留 (如 "int a" 不能变成 "inta")
-    # 上面的正则可能会误伤，所以仅对安全字符操作。
-    # 实际上，上面的正则已经很激进了。为了保证不破坏 "int main"，我们只压缩符号。
-    
-    return text
-
-def minify_python(content):
-    """
-    Python 无法移除换行，但可以移除空行、注释和多余空格
-    """
-    try:
-        # 使用 AST 重新生成代码，自动去掉注释和多余格式
-        tree = ast.parse(content)
-        # 移除 Docstrings
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.Module)):
-                if (node.body and isinstance(node.body[0], ast.Expr) and 
-                    isinstance(node.body[0].value, (ast.Str, ast.Constant))):
-                    node.body.pop(0)
-        
-        if hasattr(ast, 'unparse'):
-            return ast.unparse(tree)
-        else:
-            return content # 版本过低回退
-    except:
-        return content
-
-def process_directory(directory, output_file):
+def process_directory(directory, output_file, tokenizer='auto'):
+    tokenizer, count_tokens = get_estimator(tokenizer)
     print(f"🚀 开始压缩处理: {directory}")
     print(f"🎯 目标: RISC-V/C OS 开发环境 (保留 Struct/Asm/Ld)")
     
     files_processed = 0
     total_chars_raw = 0
     total_chars_min = 0
+    total_tokens_raw = 0
+    total_tokens_min = 0
 
     with open(output_file, 'w', encoding='utf-8') as out_f:
         # 写入一个极其简短的 Prompt 头部，告诉 AI 这是一个代码库dump
         out_f.write("<CODEBASE_CONTEXT_START>\n")
 
-        for root, dirs, files in os.walk(directory):
-            # 过滤隐藏目录
-            dirs[:] = [d for d in dirs if d not in IGNORE_DIRS and not d.startswith('.')]
+        # 忽略目录、隐藏文件与 .gitignore 规则在进入子树之前处理
+        for root, dirs, files in walk(directory, IGNORE_DIRS, hidden=False):
             
             for filename in sorted(files):
                 if not is_source_file(filename):
@@ -142,6 +61,7 @@ def process_directory(directory, output_file):
                     with open(filepath, 'r', encoding='utf-8', errors='ignore') as in_f:
                         content = in_f.read()
                         total_chars_raw += len(content)
+                        total_tokens_raw += count_tokens(content)
 
                         _, ext = os.path.splitext(filename)
                         
@@ -157,6 +77,7 @@ def process_directory(directory, output_file):
                             out_f.write(f"\n[FILE:{rel_path}]\n")
                             out_f.write(minified)
                             total_chars_min += len(minified)
+                            total_tokens_min += count_tokens(minified)
                             files_processed += 1
 
                 except Exception as e:
@@ -172,19 +93,24 @@ def process_directory(directory, output_file):
     print(f"\n✅ 处理完成!")
     print(f"📄 文件数: {files_processed}")
     print(f"📉 压缩率: {reduction:.2f}% (字符数 {total_chars_raw} -> {total_chars_min})")
+    if total_tokens_raw > 0:
+        saved = (1 - total_tokens_min / total_tokens_raw) * 100
+        print(f"🔢 Token 节省: {saved:.2f}% ({tokenizer}: {total_tokens_raw} -> {total_tokens_min})")
     print(f"💾 输出至: {output_file}")
 
 def main():
     parser = argparse.ArgumentParser(description='OS开发专用代码压缩器')
     parser.add_argument('directory', help='源代码目录')
     parser.add_argument('-o', '--output', default='daima.txt', help='输出文件名')
+    parser.add_argument('--tokenizer', default='auto', choices=['auto', 'bpe', 'chars', 'tiktoken'],
+                        help='token 估算器 (auto: 装有 tiktoken 且编码表已在本地缓存时用 tiktoken，否则 bpe 近似，不联网)')
     args = parser.parse_args()
 
     if not os.path.isdir(args.directory):
         print("错误: 目录不存在")
         sys.exit(1)
 
-    process_directory(args.directory, args.output)
+    process_directory(args.directory, args.output, args.tokenizer)
 
 if __name__ == "__main__":
     main()
@@ -2,9 +2,12 @@ import os
 import sys
 import argparse
 import re
-import ast
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ir规范'))
+from minify import minify_code
+from walker import Walker
+
 # === 配置区域 ===
 
 # 代码文件扩展名
@@ -24,6 +27,7 @@ CONFIG_FILES = {'requirements.txt', 'package.json', 'Makefile', 'CMakeLists.txt'
 class ProjectPacker:
     def __init__(self, root_dir):
         self.root_dir = os.path.abspath(root_dir)
+        self.walker = Walker(self.root_dir, IGNORE_DIRS, hidden=False)
         self.project_name = os.path.basename(self.root_dir)
         self.stats = {'files': 0, 'tokens_raw': 0, 'tokens_min': 0}
         self.dependencies = []
@@ -33,9 +37,8 @@ class ProjectPacker:
         """生成 ASCII 目录树，同时收集文件摘要"""
         tree_str = ""
         try:
-            entries = sorted(os.listdir(dir_path))
-            # 过滤忽略目录
-            entries = [e for e in entries if e not in IGNORE_DIRS and not e.startswith('.')]
+            # 过滤忽略目录、隐藏文件与 .gitignore 规则
+            entries = sorted(e.name for e in self.walker.entries(dir_path))
             
             for index, entry in enumerate(entries):
                 path = os.path.join(dir_path, entry)
@@ -112,44 +115,8 @@ class ProjectPacker:
             pass
 
     def minify_code(self, content, ext):
-        """之前定义的极致压缩逻辑"""
-        # Python
-        if ext == '.py':
-            try:
-                tree = ast.parse(content)
-                # 移除 Docstring
-                for node in ast.walk(tree):
-                    if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.Module)):
-                        if (node.body and isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant)):
-                            node.body.pop(0)
-                if hasattr(ast, 'unparse'): return ast.unparse(tree)
-            except: pass
-            return content
-
-        # C/C++/Assembly/Linker
-        else:
-            # 1. 移除注释
-            pattern = re.compile(r'//.*?$|/\*.*?\*/', re.DOTALL | re.MULTILINE)
-            content = re.sub(pattern, ' ', content)
-            
-            # 2. 压缩逻辑
-            lines = []
-            buf = []
-            for line in content.split('\n'):
-                line = line.strip()
-                if not line: continue
-                if line.startswith('#'): # 预处理指令保留换行
-                    if buf: lines.append(" ".join(buf)); buf = []
-                    lines.append(line)
-                else:
-                    buf.append(line)
-            if buf: lines.append(" ".join(buf))
-            
-            text = "\n".join(lines)
-            # 压缩符号
-            ops = r'=|\+|-|\*|/|%|&|\||\^|!|<|>|\?|:|;|,|\(|\)|\{|\}|\[|\]'
-            text = re.sub(f'\s*({ops})\s*', r'\1', text)
-            return text
+        """之前定义的极致压缩逻辑 (共享实现见 aigv/ir规范/minify.py)"""
+        return minify_code(content, ext)
 
     def pack(self, output_file):
         print(f"📦 正在打包项目: {self.project_name} ...")
@@ -176,9 +143,8 @@ class ProjectPacker:
             out.write("## 4. Source Code Context (Minified)\n")
             out.write("The following code has been minified (comments removed, whitespace compressed) to save tokens.\n\n")
             
-            for root, _, files in os.walk(self.root_dir):
-                if any(ignored in root for ignored in IGNORE_DIRS): continue
-                
+            # 与目录树使用同一个 Walker：被忽略的子树整体跳过，而不是对每个路径做子串匹配
+            for root, _, files in self.walker.walk():
                 for filename in sorted(files):
                     if not self._is_source_file(filename): continue
                     
@@ -1,4 +1,9 @@
-import os, re, argparse
+import os, re, sys, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ir规范'))
+from cdecl import parse_funcs
+from minify import minify_c, minify_asm
+from walker import walk
 
 # ===== 配置 =====
 SRC_EXT = {'.c', '.h', '.S', '.s', '.ld', 'Makefile'}
@@ -16,32 +21,7 @@ def classify(path):
             return k
     return 'other'
 
-# ===== C 代码处理 =====
-def strip_c_comments(s):
-    s = re.sub(r'/\*.*?\*/', '', s, flags=re.S)
-    s = re.sub(r'//.*', '', s)
-    return s
-
-def minify_c(s):
-    s = strip_c_comments(s)
-    lines, buf = [], []
-    for l in s.splitlines():
-        l = l.strip()
-        if not l:
-            continue
-        if l.startswith('#'):
-            if buf:
-                lines.append(" ".join(buf))
-                buf = []
-            lines.append(l)
-        else:
-            buf.append(l)
-    if buf:
-        lines.append(" ".join(buf))
-    s = "\n".join(lines)
-    s = re.sub(r'\s*([=+\-*/%&|^!<>?:;,(){}\[\]])\s*', r'\1', s)
-    return s
-
+# ===== 链接脚本处理 =====
 def minify_ld(s):
     entry = None
     base = None
@@ -74,34 +54,7 @@ def minify_ld(s):
 
     return entry, base, sections, sorted(set(symbols))
 
-# ===== 汇编专用处理（关键）=====
-def minify_asm(s):
-    out = []
-    for line in s.splitlines():
-        line = line.rstrip()
-        if not line:
-            continue
-
-        stripped = line.lstrip()
-
-        # 预处理指令必须保留
-        if stripped.startswith('#'):
-            if stripped.startswith(('#include', '#define', '#if', '#endif', '#ifdef', '#ifndef')):
-                out.append(stripped)
-            continue
-
-        # 删除行内注释
-        if '#' in line:
-            line = line.split('#', 1)[0].rstrip()
-
-        if line:
-            out.append(line)
-    return "\n".join(out)
-
 # ===== 解析工具 =====
-def parse_funcs(s):
-    return re.findall(r'\b([a-zA-Z_][\w\s\*]+?)\s+([a-zA-Z_]\w*)\s*\(', s)
-
 def parse_includes(s):
     return re.findall(r'#include\s+[<"](.+?)[>"]', s)
 
@@ -109,8 +62,7 @@ def parse_includes(s):
 def main(root, out):
     includes, funcs, code = [], [], []
 
-    for r, ds, fs in os.walk(root):
-        ds[:] = [d for d in ds if d not in IGN]
+    for r, ds, fs in walk(root, IGN):
         for f in fs:
             if f.endswith(tuple(SRC_EXT)):
                 p = os.path.join(r, f)
@@ -2,8 +2,15 @@ import os
 import sys
 import argparse
 import re
-import ast
 import json
+import hashlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aigv', 'ir规范'))
+from minify import minify_code
+from profiler import Profiler, NOPROF
+from tokens import get_estimator
+from fileio import read_bytes, decode, sniff_head, SNIFF_BYTES, MAX_FILE_SIZE
+from walker import Walker
 
 # === 配置区域 ===
 
@@ -22,59 +29,145 @@ IGNORE_DIRS = {'.git', 'build', 'dist', '__pycache__', '.vscode', 'node_modules'
 CONFIG_FILES = {'requirements.txt', 'package.json', 'Makefile', 'CMakeLists.txt'}
 
 class ProjectPacker:
-    def __init__(self, root_dir):
+    def __init__(self, root_dir, dedup=False, prof=NOPROF, tokenizer='chars', max_size=MAX_FILE_SIZE,
+                 gitignore=True, git=False):
         self.root_dir = os.path.abspath(root_dir)
+        self.walker = Walker(self.root_dir, IGNORE_DIRS, hidden=False, gitignore=gitignore, git=git)
         self.project_name = os.path.basename(self.root_dir)
-        self.stats = {'files': 0, 'tokens_raw': 0, 'tokens_min': 0}
+        self.dedup = dedup
+        self.stats = {'files': 0, 'dups': 0, 'tokens_raw': 0, 'tokens_min': 0}
         self.dependencies = []
         self.file_summaries = {} # {filepath: description}
+        self.sources = [] # 压缩后的代码块，按目录树顺序
+        self._seen = {} # {(content hash, ext): 首次出现的 rel_path}；压缩方式随扩展名而定
+        self.prof = prof # 分阶段计时，见 aigv/ir规范/profiler.py
+        self.tokenizer, self.count_tokens = get_estimator(tokenizer)
+        self.file_tokens = {} # {rel_path: (tokens_raw, tokens_min)}
+        self.max_size = max_size # 超过此大小的源文件不读取，None 表示不限
+        self.skipped = [] # [(rel_path, 'size' | 'binary')]
 
     def generate_tree(self, dir_path, prefix=""):
-        """生成 ASCII 目录树，同时收集文件摘要"""
+        """
+        单次 os.scandir 遍历：生成 ASCII 目录树，同时收集文件摘要、依赖
+        以及压缩后的代码块 (self.sources)，每个文件只读取一次
+        """
         tree_str = ""
-        try:
-            entries = sorted(os.listdir(dir_path))
-            # 过滤忽略目录
-            entries = [e for e in entries if e not in IGNORE_DIRS and not e.startswith('.')]
-            
-            for index, entry in enumerate(entries):
-                path = os.path.join(dir_path, entry)
-                is_last = (index == len(entries) - 1)
-                connector = "└── " if is_last else "├── "
-                
-                # 记录相对路径
-                rel_path = os.path.relpath(path, self.root_dir)
-                
-                if os.path.isdir(path):
-                    tree_str += f"{prefix}{connector}📁 {entry}/\n"
-                    extension = "    " if is_last else "│   "
-                    tree_str += self.generate_tree(path, prefix + extension)
-                else:
-                    if self._is_source_file(entry):
-                        desc = self._extract_file_description(path)
-                        desc_str = f"  Found: {desc}" if desc else ""
-                        tree_str += f"{prefix}{connector}📄 {entry}{'  # ' + desc if desc else ''}\n"
-                        
-                        # 收集依赖信息
-                        if entry in CONFIG_FILES:
-                            self._parse_dependencies(path, entry)
-                    else:
-                        # 非代码文件简单列出
-                        tree_str += f"{prefix}{connector}{entry}\n"
-        except PermissionError:
-            pass
+        # 忽略目录、隐藏文件与 .gitignore 规则由共享的 Walker 处理，被忽略的子树不会进入
+        entries = sorted(self.walker.entries(dir_path), key=lambda e: e.name)
+
+        for index, entry in enumerate(entries):
+            is_last = (index == len(entries) - 1)
+            connector = "└── " if is_last else "├── "
+
+            if entry.is_dir():
+                tree_str += f"{prefix}{connector}📁 {entry.name}/\n"
+                extension = "    " if is_last else "│   "
+                tree_str += self.generate_tree(entry.path, prefix + extension)
+            elif self._is_source_file(entry.name):
+                rel_path = os.path.relpath(entry.path, self.root_dir)
+                # 读全文之前先看 scandir 已有的大小，超大文件只列出不读取；文件头在读入后检查
+                try:
+                    size = entry.stat().st_size
+                    why = 'size' if self.max_size and size > self.max_size else None
+                except OSError as e:
+                    why = str(e)
+                if not why:
+                    with self.prof.file(rel_path):
+                        desc, why = self._collect_file(entry)
+                if why:
+                    self.skipped.append((rel_path, why))
+                    tree_str += f"{prefix}{connector}📄 {entry.name}  # skipped: {why}\n"
+                    continue
+                tree_str += f"{prefix}{connector}📄 {entry.name}{'  # ' + desc if desc else ''}\n"
+            else:
+                # 非代码文件简单列出
+                tree_str += f"{prefix}{connector}{entry.name}\n"
         return tree_str
 
+    def _collect_file(self, entry):
+        """
+        读取一次源文件：提取摘要、依赖，并压缩代码放入 self.sources。
+        返回 (摘要, 跳过原因)；二进制文件由已读入的开头判断，不再单独打开
+        """
+        rel_path = os.path.relpath(entry.path, self.root_dir)
+        _, ext = os.path.splitext(entry.name)
+        ftype = ext or entry.name
+        prof = self.prof
+        try:
+            # 去重哈希直接在原始字节上算，全文只解码一次
+            buf = read_bytes(entry.path)
+            why = sniff_head(buf[:SNIFF_BYTES])
+            if why:
+                return None, why
+            with prof.stage('read', ftype, len(buf)):
+                digest = hashlib.sha256(buf).hexdigest() if self.dedup else None
+                raw = decode(buf, newlines=True)
+        except Exception as e:
+            print(f"Skipping {entry.name}: {e}")
+            return None, None
+
+        with prof.stage('describe', ftype):
+            desc = self._extract_file_description(raw)
+        self.file_summaries[rel_path] = desc
+
+        # 收集依赖信息
+        if entry.name in CONFIG_FILES:
+            with prof.stage('dependencies', ftype, len(raw)):
+                self._parse_dependencies(raw, entry.name)
+
+        with prof.stage('tokens', ftype, len(raw)):
+            tokens_raw = self.count_tokens(raw)
+
+        if self.dedup:
+            if (digest, ext) in self._seen:
+                chunk = f"\n--- SAME FILE: {rel_path} = {self._seen[digest, ext]} ---\n"
+                self.sources.append(chunk)
+                self.stats['dups'] += 1
+                self._add_tokens(rel_path, tokens_raw, self.count_tokens(chunk))
+                return desc, None
+            self._seen[digest, ext] = rel_path
+
+        try:
+            with prof.stage('minify', ftype, len(raw)):
+                minified = self.minify_code(raw, ext)
+        except Exception as e:
+            print(f"Skipping {entry.name}: {e}")
+            return desc, None
+
+        tokens_min = 0
+        if minified.strip():
+            chunk = f"\n--- BEGIN FILE: {rel_path} ---\n{minified}\n--- END FILE: {rel_path} ---\n"
+            self.sources.append(chunk)
+            self.stats['files'] += 1
+            # 按实际写出的块计数，包含文件标记，与 SAME FILE 引用行口径一致
+            with prof.stage('tokens', ftype, len(chunk)):
+                tokens_min = self.count_tokens(chunk)
+        self._add_tokens(rel_path, tokens_raw, tokens_min)
+        return desc, None
+
+    def _add_tokens(self, rel_path, tokens_raw, tokens_min):
+        self.file_tokens[rel_path] = (tokens_raw, tokens_min)
+        self.stats['tokens_raw'] += tokens_raw
+        self.stats['tokens_min'] += tokens_min
+
+    def token_report(self, top=None):
+        """逐文件 token 对比，按压缩后 token 数降序"""
+        rows = sorted(self.file_tokens.items(), key=lambda kv: -kv[1][1])
+        lines = [f"{'tokens_raw':>10} {'tokens_min':>10} {'saved':>7}  file"]
+        for path, (raw, mini) in rows[:top]:
+            saved = (1 - mini / raw) * 100 if raw else 0
+            lines.append(f"{raw:>10} {mini:>10} {saved:>6.1f}%  {path}")
+        return '\n'.join(lines)
+
     def _is_source_file(self, filename):
         return any(filename.endswith(ext) for ext in SOURCE_EXTS) or filename in CONFIG_FILES
 
-    def _extract_file_description(self, filepath):
+    def _extract_file_description(self, content):
         """
-        读取文件前5行，尝试提取文件顶部的注释说明
+        取文件前5行，尝试提取文件顶部的注释说明
         """
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = [f.readline().strip() for _ in range(5)]
+            lines = [line.strip() for line in content.split('\n', 5)[:5]]
             
             # C/C++ 风格 /** Description */ 或 // Description
             for line in lines:
@@ -87,12 +180,9 @@ class ProjectPacker:
             return None
         return None
 
-    def _parse_dependencies(self, filepath, filename):
+    def _parse_dependencies(self, content, filename):
         """简单的依赖解析器"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
             if filename == 'Makefile':
                 # 提取 CFLAGS 或 LDFLAGS
                 flags = re.findall(r'(CFLAGS|LDFLAGS)\s*=\s*(.*)', content)
@@ -112,49 +202,13 @@ class ProjectPacker:
             pass
 
     def minify_code(self, content, ext):
-        """之前定义的极致压缩逻辑"""
-        # Python
-        if ext == '.py':
-            try:
-                tree = ast.parse(content)
-                # 移除 Docstring
-                for node in ast.walk(tree):
-                    if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.Module)):
-                        if (node.body and isinstance(node.body[0], ast.Expr) and isinstance(node.body[0].value, ast.Constant)):
-                            node.body.pop(0)
-                if hasattr(ast, 'unparse'): return ast.unparse(tree)
-            except: pass
-            return content
-
-        # C/C++/Assembly/Linker
-        else:
-            # 1. 移除注释
-            pattern = re.compile(r'//.*?$|/\*.*?\*/', re.DOTALL | re.MULTILINE)
-            content = re.sub(pattern, ' ', content)
-            
-            # 2. 压缩逻辑
-            lines = []
-            buf = []
-            for line in content.split('\n'):
-                line = line.strip()
-                if not line: continue
-                if line.startswith('#'): # 预处理指令保留换行
-                    if buf: lines.append(" ".join(buf)); buf = []
-                    lines.append(line)
-                else:
-                    buf.append(line)
-            if buf: lines.append(" ".join(buf))
-            
-            text = "\n".join(lines)
-            # 压缩符号
-            ops = r'=|\+|-|\*|/|%|&|\||\^|!|<|>|\?|:|;|,|\(|\)|\{|\}|\[|\]'
-            text = re.sub(f'\s*({ops})\s*', r'\1', text)
-            return text
+        """之前定义的极致压缩逻辑 (共享实现见 aigv/ir规范/minify.py)"""
+        return minify_code(content, ext)
 
     def pack(self, output_file):
         print(f"📦 正在打包项目: {self.project_name} ...")
         
-        with open(output_file, 'w', encoding='utf-8') as out:
+        with self.prof, open(output_file, 'w', encoding='utf-8') as out:
             # === HEADER 部分 ===
             out.write(f"# PROJECT SUMMARY: {self.project_name}\n")
             out.write("## 1. Metadata\n")
@@ -175,42 +229,54 @@ class ProjectPacker:
             # === BODY 部分 (代码) ===
             out.write("## 4. Source Code Context (Minified)\n")
             out.write("The following code has been minified (comments removed, whitespace compressed) to save tokens.\n\n")
-            
-            for root, _, files in os.walk(self.root_dir):
-                if any(ignored in root for ignored in IGNORE_DIRS): continue
-                
-                for filename in sorted(files):
-                    if not self._is_source_file(filename): continue
-                    
-                    filepath = os.path.join(root, filename)
-                    rel_path = os.path.relpath(filepath, self.root_dir)
-                    _, ext = os.path.splitext(filename)
-                    
-                    try:
-                        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                            raw = f.read()
-                            minified = self.minify_code(raw, ext)
-                            
-                            if minified.strip():
-                                out.write(f"\n--- BEGIN FILE: {rel_path} ---\n")
-                                out.write(minified)
-                                out.write(f"\n--- END FILE: {rel_path} ---\n")
-                                
-                                self.stats['files'] += 1
-                    except Exception as e:
-                        print(f"Skipping {filename}: {e}")
+            if self.dedup:
+                out.write("Identical files are emitted once; repeats are listed as `--- SAME FILE: <path> = <first path> ---`.\n\n")
+
+            with self.prof.stage('write') as st:
+                for chunk in self.sources:
+                    out.write(chunk)
+                st.nbytes = out.tell()
         
         print(f"✅ 完成! 已保存至: {output_file}")
         print(f"📊 统计: 包含了 {self.stats['files']} 个核心文件")
+        if self.dedup:
+            print(f"♻️  去重: {self.stats['dups']} 个重复文件以引用代替")
+        if self.skipped:
+            print(f"⏭️  跳过: {len(self.skipped)} 个超大或二进制文件")
+        raw, mini = self.stats['tokens_raw'], self.stats['tokens_min']
+        saved = (1 - mini / raw) * 100 if raw else 0
+        print(f"🔢 Token ({self.tokenizer}): {raw} -> {mini} (节省 {saved:.1f}%)")
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('dir', help='Project directory')
     parser.add_argument('-o', '--output', default='daima.txt')
+    parser.add_argument('--dedup', action='store_true', help='Emit identical files once')
+    parser.add_argument('--max-file-size', type=int, default=MAX_FILE_SIZE, metavar='BYTES',
+                        help='Skip source files larger than this (0 = no limit); binary files are always skipped')
+    parser.add_argument('--no-gitignore', action='store_true', help='Do not apply .gitignore rules')
+    parser.add_argument('--git', action='store_true', help='List files with git ls-files when inside a repo')
+    parser.add_argument('--tokenizer', default=None, choices=['auto', 'bpe', 'chars', 'tiktoken'],
+                        help='Token estimator (default: chars, or auto with --token-report; '
+                             'auto = tiktoken if its encoding is cached locally, else bpe)')
+    parser.add_argument('--token-report', type=int, nargs='?', const=0, default=None, metavar='N',
+                        help='Print per-file raw vs minified tokens (top N files, all if omitted)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Report time, calls and bytes per stage and file type to stderr')
+    parser.add_argument('--profile-top', type=int, default=10, help='Slowest files listed by --profile')
+    parser.add_argument('--profile-dump', default=None, help='Also write cProfile stats here (implies --profile)')
     args = parser.parse_args()
     
-    packer = ProjectPacker(args.dir)
+    prof = Profiler(dump=args.profile_dump) if args.profile or args.profile_dump else NOPROF
+    # 精确计数约让打包耗时翻倍，只在要看逐文件报告时默认启用
+    tokenizer = args.tokenizer or ('auto' if args.token_report is not None else 'chars')
+    packer = ProjectPacker(args.dir, dedup=args.dedup, prof=prof, tokenizer=tokenizer,
+                           max_size=args.max_file_size or None,
+                           gitignore=not args.no_gitignore, git=args.git)
     packer.pack(args.output)
+    if args.token_report is not None:
+        print(packer.token_report(args.token_report or None))
+    prof.report(args.profile_top)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file